@@ -0,0 +1,446 @@
+"""End-to-end load test for CoinItBot against local stand-ins for Neynar, Zora and the RPC node.
+
+The fake services run in a child process so the CPU and memory figures
+describe only the bot. Example:
+
+    python benchmarks/load_test.py --duration 60 --cast-rate 20 --image-ratio 0.7
+"""
+import os
+import io
+import re
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+import aiohttp
+from aiohttp import web
+from eth_abi import encode as abi_encode
+from eth_utils import keccak
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Well-known development key (first Anvil/Hardhat account); never holds real funds
+TEST_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+TEST_CHANNEL = "bench"
+IMAGE_ID_PATTERN = re.compile(rb"/images/(\d+)\.png")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile, or None without samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class FakeServices:
+    """Neynar feed, image host, Zora create endpoint and JSON-RPC node on one local port"""
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        self.base_url = f"http://127.0.0.1:{options['port']}"
+        self.casts: deque = deque(maxlen=2000)  # Oldest first
+        self.cast_created: Dict[int, float] = {}
+        self.images: Dict[int, bytes] = {}
+        self.stats = {
+            "casts": 0,
+            "image_casts": 0,
+            "zora_requests": 0,
+            "zora_errors": 0,
+            "mints": 0,
+            "deploys": 0,
+            "rpc_calls": {},
+            "mint_latency": [],
+            "deploy_latency": [],
+        }
+        self.block_number = 1
+        self.nonce = 0
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+
+        import coin_it_bot
+        self.token_created_topic = coin_it_bot.CLANKER_EVENTS.topic("TokenCreated")
+        event = next(item for item in coin_it_bot.CLANKER_ABI if item.get("name") == "TokenCreated")
+        self.token_created_types = [
+            coin_it_bot.abi_type_string(param) for param in event["inputs"] if not param["indexed"]
+        ]
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v2/farcaster/channel/search", self.channel_search)
+        app.router.add_get("/v2/farcaster/feed/channel", self.channel_feed)
+        app.router.add_route("*", "/images/{image_id}.png", self.image)
+        app.router.add_post("/zora/create", self.zora_create)
+        app.router.add_post("/rpc", self.rpc)
+        app.router.add_get("/_stats", self.get_stats)
+        return app
+
+    async def generate_casts(self):
+        """Post casts at the configured rate, a share of them with an image embed"""
+        interval = 1 / self.options["cast_rate"]
+        cast_id = 0
+        while True:
+            cast_id += 1
+            now = time.time()
+            cast = {
+                "hash": f"0x{cast_id:040x}",
+                "timestamp": now,
+                "text": f"Benchmark cast {cast_id}",
+                "author": {"username": f"user{cast_id % 50}", "display_name": f"User {cast_id % 50}"},
+                "embeds": [],
+                "channel": {"id": TEST_CHANNEL},
+            }
+            if random.random() < self.options["image_ratio"]:
+                cast["embeds"].append({"url": f"{self.base_url}/images/{cast_id}.png", "mime_type": "image/png"})
+                self.cast_created[cast_id] = now
+                self.stats["image_casts"] += 1
+            self.casts.append(cast)
+            self.stats["casts"] += 1
+            await asyncio.sleep(interval * random.expovariate(1))
+
+    async def channel_search(self, request: web.Request) -> web.Response:
+        return web.json_response({"channel": {"id": TEST_CHANNEL, "name": "Benchmark"}})
+
+    async def channel_feed(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.options["neynar_latency"])
+        limit = int(request.query.get("limit", 25))
+        offset = int(request.query.get("cursor") or 0)
+        newest_first = list(reversed(self.casts))
+        page = newest_first[offset:offset + limit]
+        cursor = str(offset + limit) if offset + limit < len(newest_first) else None
+        return web.json_response({"casts": page, "next": {"cursor": cursor}})
+
+    async def image(self, request: web.Request) -> web.Response:
+        image_id = int(request.match_info["image_id"])
+        body = self.images.get(image_id)
+        if body is None:
+            # Random noise, so perceptual hashes of different casts don't collide
+            rng = random.Random(image_id)
+            image = Image.frombytes("L", (32, 32), bytes(rng.getrandbits(8) for _ in range(32 * 32)))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            body = self.images[image_id] = buffer.getvalue()
+        if request.method == "HEAD":
+            return web.Response(headers={"Content-Type": "image/png", "Content-Length": str(len(body))})
+        return web.Response(body=body, content_type="image/png")
+
+    async def zora_create(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.stats["zora_requests"] += 1
+        await asyncio.sleep(self.options["zora_latency"])
+        if random.random() < self.options["zora_error_rate"]:
+            self.stats["zora_errors"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        match = IMAGE_ID_PATTERN.search(payload.get("image", "").encode())
+        if match:
+            created = self.cast_created.get(int(match.group(1)))
+            if created is not None:
+                self.stats["mint_latency"].append(time.time() - created)
+        self.stats["mints"] += 1
+        return web.json_response({"transaction_hash": "0x" + keccak(json.dumps(payload).encode()).hex()})
+
+    async def rpc(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.options["rpc_latency"])
+        if isinstance(body, list):
+            return web.json_response([self.rpc_call(call) for call in body])
+        return web.json_response(self.rpc_call(body))
+
+    def rpc_call(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        method = call.get("method")
+        params = call.get("params") or []
+        calls = self.stats["rpc_calls"]
+        calls[method] = calls.get(method, 0) + 1
+        try:
+            result = self.rpc_result(method, params)
+        except KeyError:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def rpc_result(self, method: str, params: List[Any]) -> Any:
+        self.block_number += 1
+        if method == "eth_chainId":
+            return hex(8453)
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method == "eth_getTransactionCount":
+            return hex(self.nonce)
+        if method in ("eth_gasPrice", "eth_maxPriorityFeePerGas"):
+            return hex(10 ** 9)
+        if method == "eth_getBalance":
+            return hex(10 ** 20)
+        if method == "eth_estimateGas":
+            return hex(5_000_000)
+        if method == "eth_getBlockByNumber":
+            return {"number": hex(self.block_number), "baseFeePerGas": hex(10 ** 8),
+                    "timestamp": hex(int(time.time())), "transactions": []}
+        if method == "eth_feeHistory":
+            return {"oldestBlock": hex(self.block_number), "baseFeePerGas": [hex(10 ** 8)] * 2,
+                    "gasUsedRatio": [0.5], "reward": [[hex(10 ** 9)]]}
+        if method == "eth_call":
+            # deployToken returns (address tokenAddress, uint256 positionId)
+            return "0x" + abi_encode(["address", "uint256"], [self.token_address(self.nonce), self.nonce]).hex()
+        if method in ("eth_sendRawTransaction", "eth_sendTransaction"):
+            return self.send_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.receipt(params[0])
+        if method == "eth_getLogs":
+            return self.logs(params[0] if params else {})
+        raise KeyError(method)
+
+    def token_address(self, nonce: int) -> str:
+        return "0x" + keccak(f"token-{nonce}".encode())[-20:].hex()
+
+    def send_transaction(self, raw: Any) -> str:
+        # Signed transactions arrive hex encoded; the image URL is in the calldata
+        raw_bytes = bytes.fromhex(raw[2:]) if isinstance(raw, str) else json.dumps(raw).encode()
+        tx_hash = "0x" + keccak(raw_bytes).hex()
+        if tx_hash not in self.transactions:
+            match = IMAGE_ID_PATTERN.search(raw_bytes)
+            self.transactions[tx_hash] = {
+                "nonce": self.nonce,
+                "sent_at": time.time(),
+                "cast_id": int(match.group(1)) if match else None,
+                "block": None,
+            }
+            self.nonce += 1
+        return tx_hash
+
+    def mined(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        tx = self.transactions.get(tx_hash)
+        if tx is None or time.time() - tx["sent_at"] < self.options["receipt_delay"]:
+            return None
+        if tx["block"] is None:
+            tx["block"] = self.block_number
+            self.stats["deploys"] += 1
+            created = self.cast_created.get(tx["cast_id"])
+            if created is not None:
+                self.stats["deploy_latency"].append(time.time() - created)
+        return tx
+
+    def log(self, tx_hash: str, tx: Dict[str, Any]) -> Dict[str, Any]:
+        wallet = "0x" + "00" * 19 + "01"
+        token = self.token_address(tx["nonce"])
+        values = [wallet, wallet, tx["nonce"], "Bench", "BENCH", -230400, "{}", 10 ** 18, 60 * 24 * 60 * 60, 30, wallet]
+        return {
+            "address": self.options["factory"],
+            "topics": [self.token_created_topic] + ["0x" + "00" * 12 + address[2:] for address in (token, wallet, wallet)],
+            "data": "0x" + abi_encode(self.token_created_types, values).hex(),
+            "blockNumber": hex(tx["block"]),
+            "transactionHash": tx_hash,
+            "logIndex": "0x0",
+            "removed": False,
+        }
+
+    def receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        tx = self.mined(tx_hash)
+        if tx is None:
+            return None
+        return {
+            "transactionHash": tx_hash,
+            "blockNumber": hex(tx["block"]),
+            "status": "0x1",
+            "gasUsed": hex(random.randint(3_000_000, 4_500_000)),
+            "effectiveGasPrice": hex(11 * 10 ** 8),
+            "logs": [self.log(tx_hash, tx)],
+        }
+
+    def logs(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from_block = int(query.get("fromBlock", "0x0"), 16)
+        to_block = int(query.get("toBlock", hex(self.block_number)), 16)
+        logs = []
+        for tx_hash in list(self.transactions):
+            tx = self.mined(tx_hash)
+            if tx is not None and from_block <= tx["block"] <= to_block:
+                logs.append(self.log(tx_hash, tx))
+        return logs
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def run_fake_services(options: Dict[str, Any], ready: multiprocessing.Event):
+    """Child-process entry point serving the fake APIs until terminated"""
+    async def serve():
+        services = FakeServices(options)
+        runner = web.AppRunner(services.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", options["port"]).start()
+        ready.set()
+        await services.generate_casts()
+
+    asyncio.run(serve())
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def configure_environment(args: argparse.Namespace, base_url: str, state_dir: str):
+    """Point the bot at the fake services; must run before coin_it_bot is imported"""
+    os.environ.update({
+        "NEYNAR_API_KEY": "bench",
+        "ZORA_API_KEY": "bench",
+        "WALLET_PRIVATE_KEY": TEST_PRIVATE_KEY,
+        "RPC_URL": f"{base_url}/rpc",
+        "CHANNEL_IDS": TEST_CHANNEL,
+        "POLLING_INTERVAL": str(args.poll_interval),
+        "MIN_POLLING_INTERVAL": str(args.poll_interval),
+        "MAX_POLLING_INTERVAL": str(args.poll_interval * 4),
+        "STATE_DIR": state_dir,
+        "LOG_FILE": os.path.join(state_dir, "bot.log"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "ENABLE_METRICS": "false",
+        "ENABLE_WEBHOOK": "false",
+        "ENABLE_CLANKER": str(not args.no_clanker).lower(),
+        "DEFAULT_RATE_LIMIT": "100000",
+        "RPC_RATE_LIMIT": "100000",
+        "JOB_POLL_INTERVAL": "0.1",
+        "JOB_RETRY_BASE": "1",
+        "DEPLOY_RECEIPT_TIMEOUT": str(max(10.0, args.receipt_delay * 5)),
+    })
+
+
+async def drive_bot(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    """Run CoinItBot against the fake services and measure it"""
+    import coin_it_bot
+
+    bot = coin_it_bot.CoinItBot(
+        neynar_key=coin_it_bot.NEYNAR_API_KEY,
+        wallet_key=coin_it_bot.WALLET_PRIVATE_KEY,
+        rpc_url=coin_it_bot.RPC_URL,
+        channel_ids=coin_it_bot.CHANNEL_IDS
+    )
+    bot.neynar.BASE_URL = f"{base_url}/v2/farcaster"
+    if bot.zora is not None:
+        bot.zora.CREATE_URL = f"{base_url}/zora/create"
+
+    task = asyncio.create_task(bot.start())
+    await asyncio.sleep(args.warmup)
+    processed_before = coin_it_bot.CASTS_PROCESSED.values.get((), 0)
+    rss_before = rss_bytes()
+    cpu_before = time.process_time()
+    started = time.monotonic()
+
+    await asyncio.sleep(args.duration)
+
+    elapsed = time.monotonic() - started
+    cpu = time.process_time() - cpu_before
+    rss_after = rss_bytes()
+    processed = coin_it_bot.CASTS_PROCESSED.values.get((), 0) - processed_before
+    jobs = bot.jobs.counts()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await bot.close()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/_stats") as response:
+            stats = await response.json()
+
+    return {
+        "duration": round(elapsed, 2),
+        "casts_generated": stats["casts"],
+        "image_casts_generated": stats["image_casts"],
+        "casts_processed": processed,
+        "casts_per_sec": round(processed / elapsed, 2),
+        "mints": stats["mints"],
+        "zora_errors": stats["zora_errors"],
+        "deploys": stats["deploys"],
+        "jobs": jobs,
+        "cast_to_mint_p50": percentile(stats["mint_latency"], 50),
+        "cast_to_mint_p99": percentile(stats["mint_latency"], 99),
+        "cast_to_deploy_p50": percentile(stats["deploy_latency"], 50),
+        "cast_to_deploy_p99": percentile(stats["deploy_latency"], 99),
+        "rss_mb": round(rss_after / 2 ** 20, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 2 ** 20, 1),
+        "cpu_ms_per_cast": round(cpu * 1000 / processed, 3) if processed else None,
+        "rpc_calls": stats["rpc_calls"],
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    def seconds(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value * 1000:.0f} ms"
+
+    print(f"Duration:            {result['duration']} s")
+    print(f"Casts generated:     {result['casts_generated']} ({result['image_casts_generated']} with images)")
+    print(f"Casts processed:     {result['casts_processed']} ({result['casts_per_sec']} casts/sec)")
+    print(f"Zora mints:          {result['mints']} ({result['zora_errors']} injected errors)")
+    print(f"Clanker deploys:     {result['deploys']}")
+    print(f"Jobs by state:       {result['jobs']}")
+    print(f"Cast to mint:        p50 {seconds(result['cast_to_mint_p50'])}, p99 {seconds(result['cast_to_mint_p99'])}")
+    print(f"Cast to deploy:      p50 {seconds(result['cast_to_deploy_p50'])}, "
+          f"p99 {seconds(result['cast_to_deploy_p99'])}")
+    print(f"RSS:                 {result['rss_mb']} MB ({result['rss_growth_mb']:+} MB during the run)")
+    print(f"CPU per cast:        {result['cpu_ms_per_cast']} ms")
+    print(f"RPC calls:           {result['rpc_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test CoinItBot against local fake services")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds to run before measuring")
+    parser.add_argument("--cast-rate", type=float, default=10, help="Casts posted per second")
+    parser.add_argument("--image-ratio", type=float, default=0.5, help="Share of casts with an image")
+    parser.add_argument("--poll-interval", type=float, default=1, help="Bot polling interval in seconds")
+    parser.add_argument("--neynar-latency", type=float, default=0.02, help="Seconds added to feed requests")
+    parser.add_argument("--zora-latency", type=float, default=0.2, help="Seconds added to Zora creates")
+    parser.add_argument("--zora-error-rate", type=float, default=0.0, help="Share of Zora creates that fail")
+    parser.add_argument("--rpc-latency", type=float, default=0.01, help="Seconds added to RPC calls")
+    parser.add_argument("--receipt-delay", type=float, default=2, help="Seconds until a transaction is mined")
+    parser.add_argument("--no-clanker", action="store_true", help="Only mint on Zora")
+    parser.add_argument("--port", type=int, default=18545, help="Port for the fake services")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    state_dir = tempfile.mkdtemp(prefix="coinit-bench-")
+    configure_environment(args, base_url, state_dir)
+
+    options = {
+        "port": args.port,
+        "cast_rate": args.cast_rate,
+        "image_ratio": args.image_ratio,
+        "neynar_latency": args.neynar_latency,
+        "zora_latency": args.zora_latency,
+        "zora_error_rate": args.zora_error_rate,
+        "rpc_latency": args.rpc_latency,
+        "receipt_delay": args.receipt_delay,
+        "factory": os.getenv("CLANKER_FACTORY_ADDRESS", "0x2A787b2362021cC3eEa3C24C4748a6cD5B687382"),
+    }
+    ready = multiprocessing.Event()
+    services = multiprocessing.Process(target=run_fake_services, args=(options, ready), daemon=True)
+    services.start()
+    try:
+        if not ready.wait(timeout=30):
+            raise RuntimeError("Fake services did not start")
+        result = asyncio.run(drive_bot(args, base_url))
+    finally:
+        services.terminate()
+        services.join()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,257 @@
 import os
+import io
+import re
 import logging
 import asyncio
 import json
 import time
 import random
-import crypto
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Set, Union
-import requests
+import heapq
+import math
+import codecs
+import hashlib
+import hmac
+import secrets
+import argparse
+import socket
+import signal
+import subprocess
+import sys
+import sqlite3
+import threading
+import queue
+import struct
+import zlib
+import atexit
+import contextlib
+import contextvars
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any, Set, Tuple, Union, Callable, Awaitable, Mapping, Collection
+from urllib.parse import urlsplit, urlunsplit
+import aiohttp
+from aiohttp import web
+from multidict import CIMultiDict
+import numpy as np
+from PIL import Image
 from dotenv import load_dotenv
+from pythonjsonlogger import jsonlogger
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import keccak, to_checksum_address
 import viem
-from viem import Address, WalletClient, PublicClient, createPublicClient, createWalletClient, http, parseEther
+from viem import Address, WalletClient, PublicClient, createPublicClient, createWalletClient, custom, http, parseEther
 from viem.accounts import privateKeyToAccount
 from viem.chains import base
 
+# Optional fast JSON backends for feed decoding
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_FILE = os.getenv("LOG_FILE", os.path.join("logs", "bot.log"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Size at which the log file is rotated
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # Rotated log files kept
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, log_file: str = LOG_FILE,
+                      max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT) -> QueueListener:
+    """Route all logging through a queue so the event loop never blocks on log I/O.
+
+    Records are only enqueued by the calling code; a background thread
+    formats them (JSON or text) and writes them to the console and to a
+    size-rotated log file.
+    """
+    if log_format == "json":
+        formatter = jsonlogger.JsonFormatter(
+            "%(asctime)s %(name)s %(levelname)s %(message)s",
+            rename_fields={"asctime": "time", "levelname": "level", "name": "logger"}
+        )
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Flush queued records on exit
+    return listener
+
+
+LOG_LISTENER = configure_logging()
 logger = logging.getLogger(__name__)
 
 # API Keys and configuration
 NEYNAR_API_KEY = os.getenv("NEYNAR_API_KEY")
 ZORA_API_KEY = os.getenv("ZORA_API_KEY")
 WALLET_PRIVATE_KEY = os.getenv("WALLET_PRIVATE_KEY")
+# Comma-separated signer keys to spread deployments over; defaults to WALLET_PRIVATE_KEY
+WALLET_PRIVATE_KEYS = [
+    k.strip() for k in os.getenv("WALLET_PRIVATE_KEYS", WALLET_PRIVATE_KEY or "").split(",") if k.strip()
+]
 CLANKER_FACTORY_ADDRESS = os.getenv("CLANKER_FACTORY_ADDRESS", "0x2A787b2362021cC3eEa3C24C4748a6cD5B687382")
 RPC_URL = os.getenv("RPC_URL", "https://mainnet.base.org")
 
 # Channel configuration
 PLANTS_CHANNEL_ID = os.getenv("PLANTS_CHANNEL_ID", "plants")
 POLLING_INTERVAL = int(os.getenv("POLLING_INTERVAL", "60"))  # Seconds between API calls
+CHANNEL_IDS = [c.strip() for c in os.getenv("CHANNEL_IDS", PLANTS_CHANNEL_ID).split(",") if c.strip()]
+
+# Feed pagination configuration
+FEED_PROBE_LIMIT = int(os.getenv("FEED_PROBE_LIMIT", "5"))  # Casts requested by the first page of each poll
+FEED_PAGE_LIMIT = int(os.getenv("FEED_PAGE_LIMIT", "100"))  # Casts requested per backfill page
+FEED_MAX_PAGES = int(os.getenv("FEED_MAX_PAGES", "10"))  # Pages walked back before giving up on a burst
+FEED_JSON_BACKEND = os.getenv("FEED_JSON_BACKEND", "auto").lower()  # "auto", "msgspec", "orjson" or "json"
+FEED_STREAM_MIN_LIMIT = int(os.getenv("FEED_STREAM_MIN_LIMIT", "50"))  # Pages this large are decoded incrementally
+
+# Scheduler configuration
+MAX_CONCURRENT_POLLS = int(os.getenv("MAX_CONCURRENT_POLLS", "10"))  # Channels polled at the same time
+MIN_POLLING_INTERVAL = float(os.getenv("MIN_POLLING_INTERVAL", "10"))  # Fastest poll for busy channels
+MAX_POLLING_INTERVAL = float(os.getenv("MAX_POLLING_INTERVAL", "600"))  # Slowest poll for quiet channels
 
 # Feature toggles
 ENABLE_ZORA = os.getenv("ENABLE_ZORA", "true").lower() == "true"
 ENABLE_CLANKER = os.getenv("ENABLE_CLANKER", "false").lower() == "true"
 
+# Webhook ingestion configuration
+ENABLE_WEBHOOK = os.getenv("ENABLE_WEBHOOK", "false").lower() == "true"
+NEYNAR_WEBHOOK_SECRET = os.getenv("NEYNAR_WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhooks/neynar")
+WEBHOOK_RECONCILE_INTERVAL = float(os.getenv("WEBHOOK_RECONCILE_INTERVAL", "600"))  # Fallback poll while on webhooks
+
+# Metrics and health endpoint configuration
+ENABLE_METRICS = os.getenv("ENABLE_METRICS", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "1"))  # Seconds between event-loop lag samples
+HEALTH_MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "5"))  # Lag in seconds that fails the health check
+
+# Transaction configuration
+MAX_PENDING_DEPLOYS = int(os.getenv("MAX_PENDING_DEPLOYS", "5"))  # Deployments in flight at once
+DEPLOY_RECEIPT_TIMEOUT = float(os.getenv("DEPLOY_RECEIPT_TIMEOUT", "60"))  # Seconds before a tx counts as stuck
+DEPLOY_MAX_REPLACEMENTS = int(os.getenv("DEPLOY_MAX_REPLACEMENTS", "3"))  # Fee bumps before giving up
+DEPLOY_BASE_FEE_CAP_GWEI = float(os.getenv("DEPLOY_BASE_FEE_CAP_GWEI", "0"))  # Hold deploys above this base fee; 0 = off
+DEPLOY_MAX_FEE_GWEI = float(os.getenv("DEPLOY_MAX_FEE_GWEI", "0"))  # Ceiling for maxFeePerGas incl. bumps; 0 = none
+DEPLOY_MAX_GAS_WAIT = float(os.getenv("DEPLOY_MAX_GAS_WAIT", "1800"))  # Seconds a deploy may wait for cheaper gas
+DEPLOY_RELEASE_BATCH = int(os.getenv("DEPLOY_RELEASE_BATCH", "10"))  # Deploys released per fee check under the cap
+GAS_POLL_INTERVAL = float(os.getenv("GAS_POLL_INTERVAL", "15"))  # Seconds between base-fee checks
+GAS_HISTORY_BLOCKS = int(os.getenv("GAS_HISTORY_BLOCKS", "20"))  # Blocks of base-fee history kept
+SALT_POOL_SIZE = int(os.getenv("SALT_POOL_SIZE", "64"))  # Deployment salts generated ahead of time
+DEPLOY_GAS_BUMP_PERCENT = int(os.getenv("DEPLOY_GAS_BUMP_PERCENT", "15"))  # Nodes require at least 10%
+
+CONFIRM_VIA_LOGS = os.getenv("CONFIRM_VIA_LOGS", "false").lower() == "true"  # Batch confirmations via eth_getLogs
+LOG_WATCH_INTERVAL = float(os.getenv("LOG_WATCH_INTERVAL", "2"))  # Seconds between eth_getLogs scans
+LOG_WATCH_MAX_BLOCKS = int(os.getenv("LOG_WATCH_MAX_BLOCKS", "1000"))  # Largest block range per eth_getLogs call
+
+# Wallet pool configuration
+WALLET_SHARD_BY = os.getenv("WALLET_SHARD_BY", "author").lower()  # "author", "channel" or "cast" keeps a wallet
+WALLET_MIN_BALANCE_ETH = float(os.getenv("WALLET_MIN_BALANCE_ETH", "0.02"))  # Below this a wallet gets no new deploys
+BALANCE_CHECK_INTERVAL = float(os.getenv("BALANCE_CHECK_INTERVAL", "60"))  # Seconds between wallet balance checks
+
+# Processing pipeline configuration
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))  # Casts buffered between stages
+VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", "8"))  # Concurrent image verifications
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "4"))  # Concurrent Zora/Clanker publications
+
+# Image verification cache configuration
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "10000"))  # Verified URLs kept in memory
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "3600"))  # Seconds a successful check stays fresh
+IMAGE_CACHE_NEGATIVE_TTL = float(os.getenv("IMAGE_CACHE_NEGATIVE_TTL", "60"))  # Seconds a failed check is cached
+
+# Perceptual-hash duplicate detection configuration
+ENABLE_IMAGE_DEDUP = os.getenv("ENABLE_IMAGE_DEDUP", "true").lower() == "true"
+IMAGE_DEDUP_THRESHOLD = int(os.getenv("IMAGE_DEDUP_THRESHOLD", "4"))  # Max differing bits for a near-duplicate
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))  # Largest image downloaded for hashing
+
+# Persistent state configuration (the logs directory is mounted as a volume in docker-compose)
+STATE_DIR = os.getenv("STATE_DIR", "logs")
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "sqlite").lower()  # "sqlite" or "memory"
+DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH", os.path.join(STATE_DIR, "dedup.sqlite3"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))  # Oldest hashes are evicted past this
+DEDUP_TTL = float(os.getenv("DEDUP_TTL_DAYS", "30")) * 24 * 60 * 60  # Hashes older than this are evicted
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "10000"))  # Recently seen hashes kept in memory
+ENABLE_DEDUP_BLOOM = os.getenv("ENABLE_DEDUP_BLOOM", "true").lower() == "true"
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(STATE_DIR, "jobs.sqlite3"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))  # Attempts before a mint/deploy job is failed
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "30"))  # Seconds before the first retry, doubled per attempt
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX", "3600"))  # Longest wait between retries
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # Seconds idle workers wait before checking again
+IMAGE_HASH_DB_PATH = os.getenv("IMAGE_HASH_DB_PATH", os.path.join(STATE_DIR, "image_hashes.sqlite3"))
+ENABLE_STATE_CHECKPOINT = os.getenv("ENABLE_STATE_CHECKPOINT", "true").lower() == "true"
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH", os.path.join(STATE_DIR, "state.snapshot"))
+STATE_WAL_PATH = os.getenv("STATE_WAL_PATH", os.path.join(STATE_DIR, "state.wal"))
+STATE_SNAPSHOT_INTERVAL = float(os.getenv("STATE_SNAPSHOT_INTERVAL", "60"))  # Seconds between full snapshots
+STATE_WAL_MAX_BYTES = int(os.getenv("STATE_WAL_MAX_BYTES", str(4 * 1024 * 1024)))  # Log size forcing a snapshot
+
+# Local image store configuration
+ENABLE_IMAGE_STORE = os.getenv("ENABLE_IMAGE_STORE", "false").lower() == "true"
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(STATE_DIR, "images"))
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(1024 ** 3)))  # Disk used before LRU eviction
+IMAGE_STORE_PUBLIC_URL = os.getenv("IMAGE_STORE_PUBLIC_URL", "")  # Where /images is reachable; empty = not served
+IMAGE_STORE_HOST = os.getenv("IMAGE_STORE_HOST", "0.0.0.0")
+IMAGE_STORE_PORT = int(os.getenv("IMAGE_STORE_PORT", "8081"))
+
+# Horizontal scaling configuration (workers share state through SQLite files in STATE_DIR)
+ENABLE_PARTITIONING = os.getenv("ENABLE_PARTITIONING", "false").lower() == "true"
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+COORDINATION_DB_PATH = os.getenv("COORDINATION_DB_PATH", os.path.join(STATE_DIR, "coordination.sqlite3"))
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))  # Seconds before a silent worker's channels and wallets move
+LEASE_RENEW_INTERVAL = float(os.getenv("LEASE_RENEW_INTERVAL", "10"))  # Seconds between heartbeats and rebalances
+
+# HTTP connection pool configuration
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # Max open connections overall
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))  # Max open connections per host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))  # Total seconds per request
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))  # Seconds to establish a connection
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))  # Seconds to keep idle connections
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))  # Retries of a rate-limited request
+
+# Rate limits in requests per second, per host
+NEYNAR_RATE_LIMIT = float(os.getenv("NEYNAR_RATE_LIMIT", "5"))
+ZORA_RATE_LIMIT = float(os.getenv("ZORA_RATE_LIMIT", "2"))
+RPC_RATE_LIMIT = float(os.getenv("RPC_RATE_LIMIT", "10"))
+DEFAULT_RATE_LIMIT = float(os.getenv("DEFAULT_RATE_LIMIT", "20"))  # Any other host, e.g. image CDNs
+RATE_LIMIT_BACKOFF = float(os.getenv("RATE_LIMIT_BACKOFF", "1"))  # Base seconds of backoff after a 429
+RATE_LIMIT_MAX_BACKOFF = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "60"))
+
+# JSON-RPC batching configuration
+ENABLE_RPC_BATCHING = os.getenv("ENABLE_RPC_BATCHING", "true").lower() == "true"
+RPC_BATCH_WINDOW = float(os.getenv("RPC_BATCH_WINDOW", "0.01"))  # Seconds to collect calls into one batch
+RPC_BATCH_MAX = int(os.getenv("RPC_BATCH_MAX", "50"))  # Calls per batch request
+
+# Request priorities when rate budget is tight (lower goes first)
+PRIORITY_CONFIRM = 0  # Deploy/mint confirmations
+PRIORITY_PUBLISH = 1  # Zora creates and contract writes
+PRIORITY_VERIFY = 2  # Image checks and downloads
+PRIORITY_DISCOVERY = 3  # Feed and channel polls
+
 # Constants for Clanker integration
 CLANKER_ABI = [
     {
@@ -139,405 +348,4052 @@ CLANKER_ABI = [
     }
 ]
 
-# Define core classes for our application
-class NeynarAPI:
-    """Client for Neynar API to monitor Farcaster channels"""
-    
-    BASE_URL = "https://api.neynar.com/v2/farcaster"
-    
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.headers = {
-            "x-api-key": api_key,
-            "Content-Type": "application/json"
-        }
-        self.last_processed_time = int(time.time())  # Start with current time
-        
-    def get_channel_info(self, channel_id: str) -> Dict:
-        """Get information about a channel by ID or name"""
-        url = f"{self.BASE_URL}/channel/search"
-        params = {
-            "q": channel_id,
-            "type": "channel_id" if channel_id.isdigit() else "name"
-        }
-        
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching channel info: {str(e)}")
-            if hasattr(e, 'response') and e.response:
-                logger.error(f"Response content: {e.response.text}")
-            raise
+# Prometheus-style metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+GAS_BUCKETS = (100_000, 250_000, 500_000, 1_000_000, 2_000_000, 4_000_000, 8_000_000)
 
-    def get_channel_casts(self, channel_id: str, limit: int = 20) -> List[Dict]:
-        """Get recent casts in a channel"""
-        url = f"{self.BASE_URL}/feed/channel"
-        params = {
-            "channel_id": channel_id,
-            "limit": limit,
-        }
-        
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("casts", [])
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching channel casts: {str(e)}")
-            if hasattr(e, 'response') and e.response:
-                logger.error(f"Response content: {e.response.text}")
-            return []
 
-    def get_new_images(self, channel_id: str, limit: int = 20) -> List[Dict]:
-        """Get new image casts since last check"""
-        casts = self.get_channel_casts(channel_id, limit)
-        
-        # Filter for casts with images that are newer than last_processed_time
-        new_image_casts = []
-        current_time = int(time.time())
-        
-        for cast in casts:
-            # Check if the cast has at least one embedded image
-            has_image = False
-            valid_image_urls = []
-            
-            # Check both embeds and embedded_media
-            for embed in cast.get("embeds", []):
-                if embed.get("url") and (
-                    embed.get("url").endswith((".jpg", ".jpeg", ".png", ".gif")) or
-                    "image" in embed.get("mime_type", "")
-                ):
-                    has_image = True
-                    valid_image_urls.append(embed.get("url"))
-            
-            # Also check any other media fields
-            if cast.get("embedded_media"):
-                for media in cast.get("embedded_media", []):
-                    if media.get("url") and (
-                        media.get("url").endswith((".jpg", ".jpeg", ".png", ".gif")) or
-                        "image" in media.get("type", "")
-                    ):
-                        has_image = True
-                        valid_image_urls.append(media.get("url"))
-            
-            # Store the image URLs in the cast for later use
-            cast["image_urls"] = valid_image_urls
-            
-            # Check if the cast is newer than our last check
-            timestamp = cast.get("timestamp", 0)
-            if has_image and timestamp > self.last_processed_time and valid_image_urls:
-                new_image_casts.append(cast)
-        
-        # Update the last processed time
-        if new_image_casts:
-            self.last_processed_time = current_time
-            
-        return new_image_casts
+class _Timer:
+    """Context manager observing elapsed seconds into a histogram"""
 
-    def verify_image_url(self, url: str) -> bool:
-        """Verify that an image URL is accessible"""
-        try:
-            response = requests.head(url, timeout=5)
-            return response.status_code == 200 and 'image' in response.headers.get('Content-Type', '')
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error verifying image URL: {str(e)}")
-            return False
+    __slots__ = ("histogram", "labels", "start")
 
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
 
-class ZoraAPI:
-    """Client for Zora API to create and manage mints"""
-    
-    def __init__(self, api_key: str, wallet_client: WalletClient, chain: str = "base"):
-        self.api_key = api_key
-        self.wallet_client = wallet_client
-        self.chain = chain
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-    def prepare_metadata(self, image_url: str, metadata: Dict) -> Dict:
-        """Prepare metadata for Zora using the direct image URL"""
-        return {
-            "name": metadata.get("name"),
-            "description": metadata.get("description"),
-            "image": image_url,  # Use the original image URL
-            "attributes": metadata.get("attributes", []),
-            "external_url": metadata.get("source")
-        }
-        
-    def create_zora_mint(self, name: str, image_uri: str, description: str, creator: str) -> Dict:
-        """Create a new mint on Zora network using direct image URL"""
-        url = "https://api.zora.co/create"
-        
-        payload = {
-            "name": name,
-            "description": description,
-            "image": image_uri,  # Direct link to the image
-            "creator": creator,
-            "chain": self.chain,
-            "properties": {
-                "source": "Farcaster",
-                "originalUrl": image_uri
-            }
-        }
-        
-        try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error creating Zora mint: {str(e)}")
-            raise
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
 
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
 
-class ClankerDeployer:
-    """Client for deploying tokens using the Clanker SDK"""
-    
-    def __init__(self, wallet_client: WalletClient, public_client: PublicClient, factory_address: Address):
-        self.wallet_client = wallet_client
-        self.public_client = public_client
-        self.factory_address = factory_address
-        
-    def calculate_tick(self) -> int:
-        """Calculate appropriate tick for token"""
-        desiredPrice = 0.0000000001
-        logBase = 1.0001
-        tickSpacing = 200
-        rawTick = int(math.log(desiredPrice) / math.log(logBase))
-        initialTick = (rawTick // tickSpacing) * tickSpacing
-        return initialTick
-    
-    def generate_random_salt(self) -> str:
-        """Generate a random salt for token deployment"""
-        random_bytes = crypto.token_bytes(32)
-        return f"0x{random_bytes.hex()}"
-    
-    async def deploy_token(self, name: str, symbol: str, image_url: str, description: str) -> str:
-        """Deploy a token using the Clanker SDK"""
-        if not self.wallet_client.account:
-            raise ValueError("Wallet account not configured")
-        
-        # Create deployment data
-        deployment_data = {
-            "tokenConfig": {
-                "name": name,
-                "symbol": symbol,
-                "salt": self.generate_random_salt(),
-                "image": image_url,
-                "metadata": json.dumps({
-                    "description": description,
-                    "socialMediaUrls": [],
-                    "auditUrls": []
-                }),
-                "context": json.dumps({
-                    "interface": "Farcaster-Zora Bot",
-                    "platform": "Farcaster",
-                    "messageId": f"farcaster-{int(time.time())}",
-                    "id": f"farcaster-{int(time.time())}"
-                }),
-                "originatingChainId": self.public_client.chain_id if hasattr(self.public_client, 'chain_id') else 8453,
-            },
-            "vaultConfig": {
-                "vaultPercentage": 30,  # 30% vault
-                "vaultDuration": 60 * 24 * 60 * 60,  # 60 days
-            },
-            "poolConfig": {
-                "pairedToken": "0x4200000000000000000000000000000000000006",  # WETH on Base
-                "tickIfToken0IsNewToken": self.calculate_tick(),
-            },
-            "initialBuyConfig": {
-                "pairedTokenPoolFee": 10000,  # 1% fee
-                "pairedTokenSwapAmountOutMinimum": parseEther("0.01"),  # 0.01 ETH minimum
-            },
-            "rewardsConfig": {
-                "creatorReward": 40,  # 40% creator reward
-                "creatorAdmin": self.wallet_client.account.address,
-                "creatorRewardRecipient": self.wallet_client.account.address,
-                "interfaceAdmin": self.wallet_client.account.address,
-                "interfaceRewardRecipient": self.wallet_client.account.address,
-            }
-        }
-        
-        try:
-            # Simulate contract call
-            simulated_result = await self.public_client.simulate_contract(
-                address=self.factory_address,
-                abi=CLANKER_ABI,
-                function="deployToken",
-                args=[deployment_data],
-                value=parseEther("0.01"),  # Initial buy amount
-                account=self.wallet_client.account.address
-            )
-            
-            # Execute contract call
-            tx_hash = await self.wallet_client.write_contract(simulated_result.request)
-            logger.info(f"Token deployment transaction sent: {tx_hash}")
-            
-            # Wait for receipt
-            receipt = await self.public_client.wait_for_transaction_receipt(tx_hash)
-            
-            # Parse logs for token address
-            for log in receipt.logs:
-                if log.topics and log.topics[0] == "0x..." and len(log.topics) >= 3:  # TokenCreated event signature
-                    token_address = log.topics[1]
-                    return token_address
-            
-            raise Exception("Failed to find token address in transaction logs")
-            
-        except Exception as e:
-            logger.error(f"Error deploying token via Clanker: {str(e)}")
-            raise
 
+class Metric:
+    """A named metric with one value per combination of label values"""
 
-class CoinItBot:
-    """Bot that monitors Farcaster channels and posts images to Zora and deploys Clanker tokens"""
-    
-    def __init__(self, neynar_key: str, wallet_key: str, rpc_url: str, channel_id: str):
-        # Initialize wallet
-        self.account = privateKeyToAccount(wallet_key)
-        self.public_client = createPublicClient(
-            chain=base,
-            transport=http(rpc_url)
-        )
-        self.wallet_client = createWalletClient(
-            account=self.account,
-            chain=base,
-            transport=http(rpc_url)
-        )
-        
-        # Initialize API clients
-        self.neynar = NeynarAPI(neynar_key)
-        
-        if ENABLE_ZORA:
-            self.zora = ZoraAPI(
-                api_key=ZORA_API_KEY,
-                wallet_client=self.wallet_client,
-                chain="base"
-            )
-        else:
-            self.zora = None
-            
-        if ENABLE_CLANKER:
-            self.clanker = ClankerDeployer(
-                wallet_client=self.wallet_client,
-                public_client=self.public_client,
-                factory_address=CLANKER_FACTORY_ADDRESS
-            )
-        else:
-            self.clanker = None
-            
-        self.channel_id = channel_id
-        self.processed_casts = set()  # Keep track of processed cast IDs
-        
-    async def start(self):
-        """Start the bot's main loop"""
-        logger.info(f"Starting Social Bridge Bot to monitor channel /{self.channel_id}")
-        logger.info(f"Features enabled: Zora: {ENABLE_ZORA}, Clanker: {ENABLE_CLANKER}")
-        
-        # First, get channel info to confirm it exists
-        try:
-            channel_info = self.neynar.get_channel_info(self.channel_id)
-            logger.info(f"Connected to channel: {channel_info.get('channel', {}).get('name', 'unknown')} ({self.channel_id})")
-        except Exception as e:
-            logger.error(f"Failed to get channel info for {self.channel_id}: {str(e)}")
-            logger.error("Please check your channel ID and API key.")
-            return
-        
-        # Start monitoring loop
-        while True:
-            try:
-                await self.check_for_new_images()
-            except Exception as e:
-                logger.error(f"Error in main loop: {str(e)}")
-            
-            # Wait before next check
-            logger.debug(f"Waiting {POLLING_INTERVAL} seconds before next check")
-            await asyncio.sleep(POLLING_INTERVAL)
-    
-    async def check_for_new_images(self):
-        """Check for new images in the channel and process them"""
-        logger.debug(f"Checking for new images in channel /{self.channel_id}")
-        
-        # Get new image casts
-        new_image_casts = self.neynar.get_new_images(self.channel_id)
-        
-        if not new_image_casts:
-            logger.debug("No new image casts found")
-            return
-        
-        logger.info(f"Found {len(new_image_casts)} new image casts to process")
-        
-        # Process each new cast
-        for cast in new_image_casts:
-            cast_id = cast.get("hash")
-            
-            # Skip if we've already processed this cast
-            if cast_id in self.processed_casts:
-                continue
-            
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{self._escape(value)}"' for name, value in pairs) + "}"
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self.values.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def time(self, **labels) -> _Timer:
+        """Time a block: `with histogram.time(call="x"): ...`"""
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, (('le', repr(float(bound))),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format.
+
+    Collectors are callables run before each render, used for gauges that
+    are cheaper to read on scrape (queue depths) than to keep updated.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        for collect in self.collectors:
             try:
-                await self.process_cast(cast)
-                self.processed_casts.add(cast_id)
+                collect()
             except Exception as e:
-                logger.error(f"Error processing cast {cast_id}: {str(e)}")
-    
-    async def process_cast(self, cast: Dict):
-        """Process a single cast, extract images and publish to platforms"""
-        cast_id = cast.get("hash")
-        author = cast.get("author", {})
-        author_name = author.get("username", "unknown_user")
-        display_name = author.get("display_name", author_name)
-        text = cast.get("text", "").strip()
-        
-        logger.info(f"Processing cast {cast_id} from @{author_name}")
-        
-        # Get images directly from the precomputed image_urls field
-        images = cast.get("image_urls", [])
-        
-        if not images:
-            logger.warning(f"No images found in cast {cast_id} despite filters")
-            return
-        
-        # Create title and description for the content
-        if text:
-            title = text[:50] + ("..." if len(text) > 50 else "")
-        else:
-            title = f"Photo by @{author_name} from Farcaster"
-            
-        description = f"Posted by @{author_name} on Farcaster\n\n{text}"
-        token_name = f"{author_name[:8]}{str(int(time.time()))[-4:]}"
-        token_symbol = f"FC{str(int(time.time()))[-4:]}"
-        
-        # Process each image
-        for i, image_url in enumerate(images):
-            # Verify the image URL is valid before processing
-            if not self.neynar.verify_image_url(image_url):
-                logger.warning(f"Skipping invalid image URL: {image_url}")
-                continue
-                
-            # Upload to Zora if enabled
-            if ENABLE_ZORA and self.zora:
-                try:
-                    await self.publish_to_zora(image_url, title, description, author_name, cast_id)
-                except Exception as e:
-                    logger.error(f"Error publishing to Zora: {str(e)}")
-            
-            # Deploy Clanker token if enabled
-            if ENABLE_CLANKER and self.clanker:
-                try:
-                    await self.deploy_clanker_token(image_url, token_name, token_symbol, description)
-                except Exception as e:
-                    logger.error(f"Error deploying Clanker token: {str(e)}")
-                    
-            # Only process the first valid image to avoid spam
-            break
-    
-    async def publish_to_zora(self, image_url: str, title: str, description: str, author_name: str, cast_id: str):
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+CALL_LATENCY = METRICS.histogram(
+    "coinit_call_duration_seconds", "Latency of outbound calls on the hot path", ("call",)
+)
+CASTS_SEEN = METRICS.counter("coinit_casts_seen_total", "Casts fetched from channel feeds", ("channel",))
+IMAGE_CASTS_SEEN = METRICS.counter("coinit_image_casts_seen_total", "New casts with image embeds", ("channel",))
+CASTS_PROCESSED = METRICS.counter("coinit_casts_processed_total", "Casts that finished the pipeline")
+JOBS_FINISHED = METRICS.counter(
+    "coinit_jobs_finished_total", "Mint and deploy jobs by outcome", ("action", "outcome")
+)
+DEDUP_LOOKUPS = METRICS.counter(
+    "coinit_dedup_lookups_total", "Duplicate and cache lookups by store and result", ("store", "result")
+)
+QUEUE_DEPTH = METRICS.gauge("coinit_pipeline_queue_depth", "Casts waiting in front of each pipeline stage", ("stage",))
+JOBS_BY_STATE = METRICS.gauge("coinit_jobs", "Mint and deploy jobs by state", ("state",))
+DEPLOY_GAS_USED = METRICS.histogram(
+    "coinit_deploy_gas_used", "Gas used per confirmed token deployment", buckets=GAS_BUCKETS
+)
+DEPLOY_GAS_SPENT = METRICS.counter("coinit_deploy_gas_spent_wei_total", "Wei spent on deployment gas")
+RPC_CALLS = METRICS.counter("coinit_rpc_calls_total", "JSON-RPC calls requested, including deduplicated ones", ("method",))
+RPC_REQUESTS = METRICS.counter("coinit_rpc_requests_total", "HTTP requests carrying JSON-RPC calls")
+BASE_FEE = METRICS.gauge("coinit_base_fee_gwei", "Latest base fee seen by the gas scheduler")
+DEPLOYS_DEFERRED = METRICS.counter("coinit_deploys_deferred_total", "Deployments held back because gas was above the cap")
+WALLET_BALANCE = METRICS.gauge("coinit_wallet_balance_eth", "Balance of each signer wallet", ("wallet",))
+LOOP_LAG = METRICS.gauge("coinit_event_loop_lag_seconds", "Delay of the latest event-loop wakeup")
+PARTITIONS_OWNED = METRICS.gauge("coinit_partitions_owned", "Channels and wallets leased by this worker", ("kind",))
+IS_LEADER = METRICS.gauge("coinit_leader", "1 while this worker holds the leader lease")
+IMAGE_STORE_FETCHES = METRICS.counter("coinit_image_store_fetches_total", "Image store lookups by URL", ("result",))
+IMAGE_STORE_BYTES = METRICS.gauge("coinit_image_store_bytes", "Disk space used by stored images")
+
+
+class MetricsServer:
+    """Serves /metrics, /healthz (event loop responsive) and /readyz (bot ready for work)"""
+
+    def __init__(self, ready: Callable[[], bool], registry: MetricsRegistry = METRICS,
+                 host: str = METRICS_HOST, port: int = METRICS_PORT,
+                 lag_interval: float = LOOP_LAG_INTERVAL, max_lag: float = HEALTH_MAX_LOOP_LAG):
+        self.ready = ready
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.lag_interval = lag_interval
+        self.max_lag = max_lag
+        self.lag = 0.0
+        self.last_tick = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/healthz", self.handle_health)
+        app.router.add_get("/readyz", self.handle_ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self._measure_lag())
+        logger.info(f"Serving metrics on {self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def healthy(self) -> bool:
+        # A stalled loop can't update the lag, so also check when it last ticked
+        stalled = time.monotonic() - self.last_tick - self.lag_interval
+        return max(self.lag, stalled) <= self.max_lag
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lag = max(0.0, loop.time() - expected)
+            self.last_tick = time.monotonic()
+            LOOP_LAG.set(self.lag)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        status = 200 if self.healthy else 503
+        return web.json_response({"healthy": status == 200, "loop_lag": round(self.lag, 4)}, status=status)
+
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        ready = self.healthy and self.ready()
+        return web.json_response({"ready": ready}, status=200 if ready else 503)
+
+
+def parse_cast_timestamp(value: Union[str, int, float, None]) -> float:
+    """Convert a Neynar cast timestamp (ISO 8601 string or epoch seconds) to epoch seconds"""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        logger.warning(f"Unrecognized cast timestamp: {value}")
+        return 0.0
+
+
+class Cast:
+    """Slim record of the cast fields the bot uses"""
+
+    __slots__ = ("hash", "timestamp", "text", "author_username", "author_display_name", "embeds", "image_urls")
+
+    def __init__(self, hash: str, timestamp: float, text: str = "", author_username: str = "unknown_user",
+                 author_display_name: Optional[str] = None, embeds: Optional[List[Tuple[str, str]]] = None):
+        self.hash = hash
+        self.timestamp = timestamp
+        self.text = text
+        self.author_username = author_username
+        self.author_display_name = author_display_name or author_username
+        self.embeds = embeds or []  # (url, mime type) of every embed and embedded media item
+        self.image_urls: List[str] = []  # Filled in by NeynarAPI.filter_new_image_casts
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Cast":
+        """Build a Cast from a decoded Neynar cast object"""
+        author = data.get("author") or {}
+        embeds = [
+            (embed.get("url"), embed.get("mime_type") or "")
+            for embed in data.get("embeds") or () if embed.get("url")
+        ]
+        embeds.extend(
+            (media.get("url"), media.get("type") or "")
+            for media in data.get("embedded_media") or () if media.get("url")
+        )
+        return cls(
+            hash=data.get("hash"),
+            timestamp=parse_cast_timestamp(data.get("timestamp")),
+            text=data.get("text") or "",
+            author_username=author.get("username", "unknown_user"),
+            author_display_name=author.get("display_name"),
+            embeds=embeds
+        )
+
+    def to_record(self) -> List:
+        """Compact list form of the cast for persisted state"""
+        return [self.hash, self.timestamp, self.text, self.author_username, self.author_display_name,
+                [list(embed) for embed in self.embeds], self.image_urls]
+
+    @classmethod
+    def from_record(cls, record: List) -> "Cast":
+        cast_hash, timestamp, text, username, display_name, embeds, image_urls = record
+        cast = cls(cast_hash, timestamp, text, username, display_name, [tuple(embed) for embed in embeds])
+        cast.image_urls = list(image_urls)
+        return cast
+
+
+if msgspec is not None:
+    # Schemas listing only the fields the bot reads; msgspec skips everything else while parsing
+    class _FeedAuthor(msgspec.Struct):
+        username: str = "unknown_user"
+        display_name: Optional[str] = None
+
+    class _FeedEmbed(msgspec.Struct):
+        url: Optional[str] = None
+        mime_type: Optional[str] = None
+
+    class _FeedMedia(msgspec.Struct):
+        url: Optional[str] = None
+        type: Optional[str] = None
+
+    class _FeedCast(msgspec.Struct):
+        hash: str
+        timestamp: Union[str, float, None] = None
+        text: str = ""
+        author: Optional[_FeedAuthor] = None
+        embeds: List[_FeedEmbed] = []
+        embedded_media: List[_FeedMedia] = []
+
+    class _FeedNext(msgspec.Struct):
+        cursor: Optional[str] = None
+
+    class _FeedPage(msgspec.Struct):
+        casts: List[_FeedCast] = []
+        next: Optional[_FeedNext] = None
+
+
+class FeedStreamDecoder:
+    """Incrementally decodes the casts array of a feed response as body chunks arrive.
+
+    Each cast is parsed and converted to a Cast as soon as its JSON is
+    complete, so a large page never exists as one decoded object tree.
+    Responses that do not start with the casts array are buffered and
+    decoded in one go instead.
+    """
+
+    _ARRAY_START = re.compile(r'\s*\{\s*"casts"\s*:\s*\[')
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "start"  # start -> casts -> tail, or start -> whole
+        self.cursor: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[Cast]:
+        """Add a chunk of the body and return the casts completed by it"""
+        self._buffer += self._text.decode(chunk)
+        casts = []
+
+        if self._state == "start":
+            match = self._ARRAY_START.match(self._buffer)
+            if match:
+                self._buffer = self._buffer[match.end():]
+                self._state = "casts"
+            elif len(self._buffer) > 64 or not self._buffer.lstrip().startswith("{"):
+                self._state = "whole"  # Not the expected layout (or no data yet to tell)
+
+        if self._state == "casts":
+            pos = 0
+            buffer = self._buffer
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                if buffer[pos] == "]":
+                    self._state = "tail"
+                    pos += 1
+                    break
+                try:
+                    item, pos = self._json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Incomplete cast; wait for more data
+                casts.append(Cast.from_dict(item))
+            self._buffer = buffer[pos:]
+
+        return casts
+
+    def close(self) -> List[Cast]:
+        """Finish decoding; returns any casts only decodable from the whole body"""
+        self._buffer += self._text.decode(b"", final=True)
+        if self._state == "whole" or self._state == "start":
+            data = json.loads(self._buffer or "{}")
+            self.cursor = (data.get("next") or {}).get("cursor")
+            return [Cast.from_dict(cast) for cast in data.get("casts", [])]
+        if self._state == "casts":
+            raise ValueError("Feed response ended inside the casts array")
+
+        # Whatever follows the array is the rest of the top-level object, e.g. ,"next":{...}}
+        tail = self._buffer.strip().lstrip(",")
+        if tail and tail != "}":
+            self.cursor = (json.loads("{" + tail).get("next") or {}).get("cursor")
+        return []
+
+
+class FeedDecoder:
+    """Decodes Neynar feed responses into Cast records with the fastest available JSON backend"""
+
+    def __init__(self, backend: str = FEED_JSON_BACKEND):
+        if backend == "auto":
+            backend = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+        if (backend == "msgspec" and msgspec is None) or (backend == "orjson" and orjson is None):
+            raise ValueError(f"JSON backend {backend} is not installed")
+        if backend not in ("msgspec", "orjson", "json"):
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        self.backend = backend
+        self._page_decoder = msgspec.json.Decoder(_FeedPage) if backend == "msgspec" else None
+
+    def decode(self, body: bytes) -> Tuple[List[Cast], Optional[str]]:
+        """Decode a full feed page into casts and the cursor of the next page"""
+        if self._page_decoder is not None:
+            page = self._page_decoder.decode(body)
+            casts = [
+                Cast(
+                    hash=cast.hash,
+                    timestamp=parse_cast_timestamp(cast.timestamp),
+                    text=cast.text,
+                    author_username=cast.author.username if cast.author else "unknown_user",
+                    author_display_name=cast.author.display_name if cast.author else None,
+                    embeds=[(e.url, e.mime_type or "") for e in cast.embeds if e.url] +
+                           [(m.url, m.type or "") for m in cast.embedded_media if m.url]
+                )
+                for cast in page.casts
+            ]
+            return casts, page.next.cursor if page.next else None
+
+        data = orjson.loads(body) if self.backend == "orjson" else json.loads(body)
+        return [Cast.from_dict(cast) for cast in data.get("casts", [])], (data.get("next") or {}).get("cursor")
+
+    def stream(self) -> FeedStreamDecoder:
+        """Start an incremental decoder for a large page"""
+        return FeedStreamDecoder()
+
+
+# Image embed detection. Extensions are matched on the URL path, so query strings like ?w=800 are allowed
+IMAGE_URL_PATTERN = re.compile(r"\.(?:jpe?g|png|gif)$", re.IGNORECASE)
+
+
+def is_image_url(url: str) -> bool:
+    """Whether a URL's path, ignoring any query or fragment, ends in an image extension"""
+    try:
+        path = urlsplit(url).path
+    except ValueError:
+        return False
+    return IMAGE_URL_PATTERN.search(path) is not None
+
+
+class ImageBatch:
+    """Columnar image embeds for a page of casts.
+
+    The image URLs of cast i are urls[url_offsets[i]:url_offsets[i + 1]].
+    """
+
+    __slots__ = ("hashes", "timestamps", "url_offsets", "urls")
+
+    def __init__(self, hashes: List[str], timestamps: np.ndarray, url_offsets: np.ndarray, urls: List[str]):
+        self.hashes = hashes
+        self.timestamps = timestamps
+        self.url_offsets = url_offsets
+        self.urls = urls
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def image_urls(self, i: int) -> List[str]:
+        return self.urls[self.url_offsets[i]:self.url_offsets[i + 1]]
+
+    def image_indices(self, since: Optional[float] = None) -> np.ndarray:
+        """Indices of casts with at least one image, optionally only those newer than since"""
+        mask = np.diff(self.url_offsets) > 0
+        if since is not None:
+            mask &= self.timestamps > since
+        return np.flatnonzero(mask)
+
+
+def extract_image_batch(casts: List[Cast]) -> ImageBatch:
+    """Extract cast hashes, timestamps and image URLs from a page of casts in one pass"""
+    count = len(casts)
+    hashes: List[str] = [""] * count
+    timestamps = np.empty(count, dtype=np.float64)
+    url_offsets = np.empty(count + 1, dtype=np.int64)
+    urls: List[str] = []
+    append = urls.append
+
+    url_offsets[0] = 0
+    for i, cast in enumerate(casts):
+        hashes[i] = cast.hash
+        timestamps[i] = cast.timestamp
+
+        for url, mime_type in cast.embeds:
+            if "image" in mime_type or is_image_url(url):
+                append(url)
+
+        url_offsets[i + 1] = len(urls)
+
+    return ImageBatch(hashes, timestamps, url_offsets, urls)
+
+
+# Async HTTP layer shared by all API clients
+class HTTPResponse:
+    """Fully read HTTP response returned by AsyncHTTPClient"""
+
+    __slots__ = ("url", "status", "headers", "body")
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPStatusError(self)
+
+
+class HTTPStatusError(aiohttp.ClientError):
+    """Raised by HTTPResponse.raise_for_status for 4xx/5xx responses"""
+
+    def __init__(self, response: HTTPResponse):
+        self.response = response
+        super().__init__(f"{response.status} error for url: {response.url}")
+
+
+# Exceptions raised by the async HTTP layer for network, timeout and status failures
+HTTP_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+# Rate-limit governor shared by all outbound APIs
+class TokenBucket:
+    """Token bucket that serves waiters in priority order and adapts its rate to 429s"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Set from Retry-After and rate-limit reset headers
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority: int = PRIORITY_VERIFY):
+        """Wait for a token; higher-priority waiters are served first"""
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiters and now >= self.blocked_until and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (priority, self._sequence, future))
+        self._release()
+        await future
+
+    def _release(self):
+        """Hand out available tokens, then schedule a wake-up for the next one"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)  # Cancelled waiter
+                continue
+            if now < self.blocked_until:
+                delay = self.blocked_until - now
+            elif self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+            else:
+                self.tokens -= 1
+                heapq.heappop(self._waiters)[2].set_result(None)
+                continue
+            self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+            return
+
+    def block(self, seconds: float):
+        """Hold all requests for a number of seconds"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def slow_down(self):
+        """Halve the rate after a 429"""
+        self.rate = max(self.max_rate / 20, self.rate / 2)
+
+    def speed_up(self):
+        """Recover the rate gradually after successful requests"""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateGovernor:
+    """Per-host token buckets with priorities and adaptive backoff, shared by all API clients"""
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None, default_rate: float = DEFAULT_RATE_LIMIT):
+        self.limits = limits or {}
+        self.default_rate = default_rate
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.limits.get(key, self.default_rate))
+        return bucket
+
+    async def acquire(self, key: str, priority: int = PRIORITY_VERIFY):
+        await self.bucket(key).acquire(priority)
+
+    def observe(self, key: str, status: int, headers: Mapping[str, str], attempt: int = 0) -> Optional[float]:
+        """Update a host's bucket from a response; returns the backoff if the request should be retried"""
+        bucket = self.bucket(key)
+
+        # Respect an exhausted quota announced by rate-limit headers before we hit a 429
+        remaining = headers.get("X-RateLimit-Remaining") or headers.get("RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset") or headers.get("RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                if int(float(remaining)) <= 0:
+                    reset_at = float(reset)
+                    # Large values are epoch timestamps, small ones are seconds from now
+                    bucket.block(reset_at - time.time() if reset_at > 1e9 else reset_at)
+            except ValueError:
+                pass
+
+        if status != 429 and not (status == 503 and "Retry-After" in headers):
+            bucket.speed_up()
+            return None
+
+        bucket.slow_down()
+        delay = parse_retry_after(headers.get("Retry-After"))
+        if delay is None:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_BACKOFF * 2 ** attempt))
+        delay = min(delay, RATE_LIMIT_MAX_BACKOFF)
+        bucket.block(delay)
+        return delay
+
+
+def default_rate_limits(rpc_url: str = RPC_URL) -> Dict[str, float]:
+    """Per-host limits for the APIs the bot talks to"""
+    return {
+        "api.neynar.com": NEYNAR_RATE_LIMIT,
+        "api.zora.co": ZORA_RATE_LIMIT,
+        urlsplit(rpc_url).netloc: RPC_RATE_LIMIT,
+    }
+
+
+class AsyncHTTPClient:
+    """Shared aiohttp session with a keep-alive connection pool"""
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        timeout: float = HTTP_TIMEOUT,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        governor: Optional[RateGovernor] = None,
+        max_retries: int = HTTP_MAX_RETRIES
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.governor = governor
+        self.max_retries = max_retries
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it inside the running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None,
+                      priority: int = PRIORITY_VERIFY, **kwargs) -> HTTPResponse:
+        """Send a request over the pooled session and read the full body.
+
+        With a governor, each attempt waits for the host's rate budget and
+        rate-limited responses are retried after the governor's backoff.
+        """
+        session = await self.get_session()
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.max_retries + 1):
+            if self.governor is not None:
+                await self.governor.acquire(host, priority)
+
+            async with session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                result = HTTPResponse(str(response.url), response.status, CIMultiDict(response.headers), body)
+
+            if self.governor is None:
+                return result
+            delay = self.governor.observe(host, result.status, result.headers, attempt)
+            if delay is None or attempt == self.max_retries:
+                return result
+            # The host's bucket is blocked for the delay, so the next acquire waits it out
+            logger.warning("Rate limited by %s (HTTP %s), retrying in %.1fs", host, result.status, delay)
+
+        return result
+
+    async def stream(self, url: str, chunk_size: int = 64 * 1024, priority: int = PRIORITY_VERIFY, **kwargs):
+        """Yield the body of a GET response in chunks without buffering it"""
+        session = await self.get_session()
+        host = urlsplit(url).netloc
+        if self.governor is not None:
+            await self.governor.acquire(host, priority)
+
+        async with session.get(url, **kwargs) as response:
+            if self.governor is not None:
+                self.governor.observe(host, response.status, response.headers)
+            if response.status >= 400:
+                body = await response.read()
+                raise HTTPStatusError(HTTPResponse(str(response.url), response.status, CIMultiDict(response.headers), body))
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
+    async def download(self, url: str, max_bytes: int = IMAGE_MAX_BYTES, **kwargs) -> bytes:
+        """Stream a GET response into memory, refusing bodies larger than max_bytes"""
+        data = bytearray()
+        async for chunk in self.stream(url, **kwargs):
+            data += chunk
+            if len(data) > max_bytes:
+                raise ValueError(f"Response from {url} exceeds {max_bytes} bytes")
+        return bytes(data)
+
+    async def get(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def close(self):
+        """Close the session and release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class RPCError(Exception):
+    """Error object returned by a JSON-RPC node"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class TransactionReverted(Exception):
+    """A broadcast transaction was mined but reverted, so its nonce is spent and replacing it is pointless"""
+
+    def __init__(self, tx_hash: str):
+        super().__init__(f"Transaction {tx_hash} reverted")
+        self.tx_hash = tx_hash
+
+
+# Rate governor priority of the JSON-RPC calls made by the current task; see rpc_priority()
+RPC_PRIORITY: contextvars.ContextVar = contextvars.ContextVar("rpc_priority", default=PRIORITY_CONFIRM)
+
+
+@contextlib.contextmanager
+def rpc_priority(priority: int):
+    """Send the JSON-RPC calls made inside the block, and tasks started in it, at the given priority"""
+    token = RPC_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        RPC_PRIORITY.reset(token)
+
+
+def receipt_reverted(receipt: Any) -> bool:
+    """Whether a transaction receipt reports a failed execution"""
+    return getattr(receipt, "status", None) in (0, "0x0", "reverted")
+
+
+class BatchingRPCTransport:
+    """EIP-1193 style JSON-RPC provider that batches concurrent calls.
+
+    Calls made within RPC_BATCH_WINDOW of each other are sent as one JSON-RPC
+    batch array over the shared keep-alive pool. Identical read calls that
+    are already in flight share a single request, and the chain ID is
+    fetched once. Each batch waits for the RPC host's rate budget at the
+    most urgent rpc_priority() among its calls. Plug it into viem with
+    custom(transport).
+    """
+
+    DEDUPE_METHODS = frozenset({
+        "eth_chainId", "eth_blockNumber", "eth_gasPrice", "eth_maxPriorityFeePerGas", "eth_feeHistory",
+        "eth_getBlockByNumber", "eth_getTransactionCount", "eth_getTransactionReceipt", "eth_getLogs",
+        "eth_call", "eth_estimateGas", "eth_getBalance", "eth_getCode",
+    })
+    CACHED_METHODS = frozenset({"eth_chainId"})
+
+    def __init__(self, url: str, http_client: AsyncHTTPClient, window: float = RPC_BATCH_WINDOW,
+                 max_batch: int = RPC_BATCH_MAX):
+        self.url = url
+        self.http = http_client
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._next_id = 0
+        self._queue: List[Tuple[Dict[str, Any], asyncio.Future, int]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._cache: Dict[str, Any] = {}
+        self._batches: Set[asyncio.Task] = set()
+
+    async def request(self, args: Dict[str, Any]) -> Any:
+        """EIP-1193 entry point: request({"method": ..., "params": [...]})"""
+        return await self.call(args["method"], args.get("params") or [])
+
+    async def call(self, method: str, params: Union[List, Tuple] = ()) -> Any:
+        if method in self._cache:
+            return self._cache[method]
+        RPC_CALLS.inc(method=method)
+
+        key = None
+        if method in self.DEDUPE_METHODS:
+            key = f"{method}:{json.dumps(params, sort_keys=True, default=str)}"
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Never warn about unretrieved errors
+        if key is not None:
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._in_flight.pop(key, None))
+        self._enqueue(method, params, future)
+
+        result = await asyncio.shield(future)
+        if method in self.CACHED_METHODS:
+            self._cache[method] = result
+        return result
+
+    def _enqueue(self, method: str, params: Union[List, Tuple], future: asyncio.Future):
+        self._next_id += 1
+        call = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": list(params)}
+        self._queue.append((call, future, RPC_PRIORITY.get()))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, int]]):
+        RPC_REQUESTS.inc()
+        try:
+            payload = [call for call, _, _ in batch] if len(batch) > 1 else batch[0][0]
+            priority = min(priority for _, _, priority in batch)
+            with CALL_LATENCY.time(call="rpc_batch"):
+                response = await self.http.post(self.url, json=payload, priority=priority)
+            response.raise_for_status()
+            body = response.json()
+            replies = {reply.get("id"): reply for reply in (body if isinstance(body, list) else [body])}
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for call, future, _ in batch:
+            if future.done():
+                continue
+            reply = replies.get(call["id"])
+            if reply is None:
+                future.set_exception(RPCError(-32603, f"No response to {call['method']} in batch"))
+            elif reply.get("error"):
+                error = reply["error"]
+                future.set_exception(RPCError(error.get("code", -32603), error.get("message", ""), error.get("data")))
+            else:
+                future.set_result(reply.get("result"))
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key (case of scheme/host, default ports, fragments)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "https" and netloc.endswith(":443")) or (scheme == "http" and netloc.endswith(":80")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class ImageCheck:
+    """Cached result of verifying one image URL"""
+
+    __slots__ = ("valid", "content_type", "size", "etag", "last_modified", "expires_at")
+
+    def __init__(self, valid: bool, content_type: str = "", size: Optional[int] = None,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None, expires_at: float = 0.0):
+        self.valid = valid
+        self.content_type = content_type
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators for revalidating a stale entry with a conditional request"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ImageVerificationCache:
+    """LRU cache of image URL checks with separate TTLs for valid and broken URLs"""
+
+    def __init__(self, max_entries: int = IMAGE_CACHE_SIZE, ttl: float = IMAGE_CACHE_TTL,
+                 negative_ttl: float = IMAGE_CACHE_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, ImageCheck]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[ImageCheck]:
+        """Return the entry for a normalized URL, fresh or stale"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, valid: bool, headers: Optional[Mapping[str, str]] = None) -> ImageCheck:
+        """Store a check result along with the response's content type, size and validators"""
+        headers = headers or {}
+        length = headers.get("Content-Length")
+        entry = ImageCheck(
+            valid=valid,
+            content_type=headers.get("Content-Type", ""),
+            size=int(length) if length and length.isdigit() else None,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            expires_at=time.time() + (self.ttl if valid else self.negative_ttl)
+        )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, key: str, entry: ImageCheck) -> ImageCheck:
+        """Extend a revalidated entry after a 304 Not Modified"""
+        entry.expires_at = time.time() + (self.ttl if entry.valid else self.negative_ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Define core classes for our application
+class NeynarAPI:
+    """Client for Neynar API to monitor Farcaster channels"""
+    
+    BASE_URL = "https://api.neynar.com/v2/farcaster"
+    
+    def __init__(self, api_key: str, http_client: Optional[AsyncHTTPClient] = None):
+        self.api_key = api_key
+        self.http = http_client or AsyncHTTPClient()
+        self.feed_decoder = FeedDecoder()
+        self.image_cache = ImageVerificationCache()
+        self._image_checks: Dict[str, asyncio.Future] = {}  # Verifications in progress, by normalized URL
+        self.headers = {
+            "x-api-key": api_key,
+            "Content-Type": "application/json"
+        }
+
+    async def get_channel_info_async(self, channel_id: str) -> Dict:
+        """Get information about a channel by ID or name without blocking the event loop"""
+        url = f"{self.BASE_URL}/channel/search"
+        params = {
+            "q": channel_id,
+            "type": "channel_id" if channel_id.isdigit() else "name"
+        }
+
+        try:
+            response = await self.http.get(url, headers=self.headers, params=params,
+                                           priority=PRIORITY_DISCOVERY)
+            response.raise_for_status()
+            return response.json()
+        except HTTP_ERRORS as e:
+            logger.error(f"Error fetching channel info: {str(e)}")
+            if getattr(e, 'response', None) is not None:
+                logger.error(f"Response content: {e.response.text}")
+            raise
+
+    async def get_channel_casts_page_async(self, channel_id: str, limit: int,
+                                           cursor: Optional[str] = None) -> Tuple[List[Cast], Optional[str]]:
+        """Get one page of a channel feed and the cursor for the next (older) page"""
+        url = f"{self.BASE_URL}/feed/channel"
+        params = {
+            "channel_id": channel_id,
+            "limit": limit,
+        }
+        if cursor:
+            params["cursor"] = cursor
+
+        try:
+            with CALL_LATENCY.time(call="neynar_fetch"):
+                # Large backfill pages are decoded incrementally as they download
+                if limit >= FEED_STREAM_MIN_LIMIT:
+                    decoder = self.feed_decoder.stream()
+                    casts = []
+                    async for chunk in self.http.stream(url, headers=self.headers, params=params,
+                                                        priority=PRIORITY_DISCOVERY):
+                        casts.extend(decoder.feed(chunk))
+                    casts.extend(decoder.close())
+                    return casts, decoder.cursor
+
+                response = await self.http.get(url, headers=self.headers, params=params,
+                                               priority=PRIORITY_DISCOVERY)
+                response.raise_for_status()
+                return self.feed_decoder.decode(response.body)
+        except HTTP_ERRORS as e:
+            logger.error(f"Error fetching channel casts: {str(e)}")
+            if getattr(e, 'response', None) is not None:
+                logger.error(f"Response content: {e.response.text}")
+            raise
+
+    async def get_casts_since_async(
+        self,
+        channel_id: str,
+        since_timestamp: float,
+        since_hash: Optional[str] = None,
+        probe_limit: int = FEED_PROBE_LIMIT,
+        page_limit: int = FEED_PAGE_LIMIT,
+        max_pages: int = FEED_MAX_PAGES
+    ) -> List[Cast]:
+        """Get every cast newer than the high-water mark, newest first.
+
+        The first request is a small probe so idle polls stay cheap. If the
+        whole probe is new, older pages are walked via the feed cursor until
+        the previous high-water cast (or anything older) is reached.
+        """
+        new_casts = []
+        cursor = None
+        limit = probe_limit
+
+        for _ in range(max_pages):
+            casts, cursor = await self.get_channel_casts_page_async(channel_id, limit, cursor)
+
+            for cast in casts:
+                if (since_hash and cast.hash == since_hash) or cast.timestamp < since_timestamp:
+                    return new_casts
+                new_casts.append(cast)
+
+            if not cursor or not casts:
+                return new_casts
+            limit = page_limit
+
+        logger.warning(f"Backfill of /{channel_id} stopped after {max_pages} pages; older casts were skipped")
+        return new_casts
+
+    def filter_new_image_casts(self, casts: List[Cast], since: Optional[float] = None) -> List[Cast]:
+        """Filter for casts with images, optionally only those newer than since"""
+        batch = extract_image_batch(casts)
+        new_image_casts = []
+
+        for i in batch.image_indices(since):
+            cast = casts[i]
+            # Store the image URLs in the cast for later use
+            cast.image_urls = batch.image_urls(i)
+            new_image_casts.append(cast)
+
+        return new_image_casts
+
+    async def verify_image_url_async(self, url: str) -> bool:
+        """Verify that an image URL is accessible, using the verification cache"""
+        key = normalize_url(url)
+        entry = self.image_cache.get(key)
+        if entry is not None and entry.fresh:
+            DEDUP_LOOKUPS.inc(store="image_cache", result="hit")
+            return entry.valid
+        DEDUP_LOOKUPS.inc(store="image_cache", result="miss")
+
+        # Share a single request between concurrent checks of the same URL
+        pending = self._image_checks.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._image_checks[key] = future
+        try:
+            valid = await self._check_image_url(url, key, entry)
+            future.set_result(valid)
+            return valid
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._image_checks[key]
+
+    async def _check_image_url(self, url: str, key: str, entry: Optional[ImageCheck]) -> bool:
+        """HEAD an image URL, revalidating a stale cache entry with its validators when possible"""
+        headers = entry.conditional_headers() if entry is not None else {}
+        try:
+            with CALL_LATENCY.time(call="image_verify"):
+                response = await self.http.head(url, headers=headers, timeout=5, allow_redirects=True)
+        except HTTP_ERRORS as e:
+            logger.error("Error verifying image URL %s: %s", url, e)
+            self.image_cache.put(key, False)
+            return False
+
+        if response.status == 304 and entry is not None:
+            return self.image_cache.refresh(key, entry).valid
+
+        valid = response.status == 200 and 'image' in response.headers.get('Content-Type', '')
+        return self.image_cache.put(key, valid, response.headers).valid
+
+
+class ZoraAPI:
+    """Client for Zora API to create and manage mints"""
+    
+    CREATE_URL = "https://api.zora.co/create"
+
+    def __init__(self, api_key: str, wallet_client: WalletClient, chain: str = "base",
+                 http_client: Optional[AsyncHTTPClient] = None):
+        self.api_key = api_key
+        self.http = http_client or AsyncHTTPClient()
+        self.wallet_client = wallet_client
+        self.chain = chain
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+    def prepare_metadata(self, image_url: str, metadata: Dict) -> Dict:
+        """Prepare metadata for Zora using the direct image URL"""
+        return {
+            "name": metadata.get("name"),
+            "description": metadata.get("description"),
+            "image": image_url,  # Use the original image URL
+            "attributes": metadata.get("attributes", []),
+            "external_url": metadata.get("source")
+        }
+        
+    def build_mint_payload(self, name: str, image_uri: str, description: str, creator: str) -> Dict:
+        """Build the request body for the Zora create endpoint"""
+        return {
+            "name": name,
+            "description": description,
+            "image": image_uri,  # Direct link to the image
+            "creator": creator,
+            "chain": self.chain,
+            "properties": {
+                "source": "Farcaster",
+                "originalUrl": image_uri
+            }
+        }
+
+    async def create_zora_mint_async(self, name: str, image_uri: str, description: str, creator: str,
+                                     idempotency_key: Optional[str] = None) -> Dict:
+        """Create a new mint on Zora network without blocking the event loop.
+
+        idempotency_key is sent as the Idempotency-Key header, so a retried
+        request for the same mint is not created twice.
+        """
+        payload = self.build_mint_payload(name, image_uri, description, creator)
+        headers = self.headers
+        if idempotency_key:
+            headers = {**self.headers, "Idempotency-Key": idempotency_key}
+
+        try:
+            with CALL_LATENCY.time(call="zora_create"):
+                response = await self.http.post(self.CREATE_URL, headers=headers, json=payload,
+                                                priority=PRIORITY_PUBLISH)
+            response.raise_for_status()
+            return response.json()
+        except HTTP_ERRORS as e:
+            logger.error(f"Error creating Zora mint: {str(e)}")
+            if getattr(e, 'response', None) is not None:
+                logger.error(f"Response content: {e.response.text}")
+            raise
+
+
+# ABI event decoding
+def to_bytes(value: Union[str, bytes, None]) -> bytes:
+    """Convert a hex string or bytes-like value from the RPC into bytes"""
+    if value is None:
+        return b""
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def abi_type_string(param: Dict) -> str:
+    """Canonical ABI type of a parameter, expanding tuples into their component types"""
+    abi_type = param["type"]
+    if abi_type.startswith("tuple"):
+        components = ",".join(abi_type_string(c) for c in param["components"])
+        return f"({components}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def abi_signature(item: Dict) -> str:
+    """Signature of an ABI function or event, e.g. Transfer(address,address,uint256)"""
+    return f"{item['name']}({','.join(abi_type_string(p) for p in item['inputs'])})"
+
+
+class EventDecoder:
+    """Decodes logs of a single ABI event into a dict of named fields"""
+
+    def __init__(self, event_abi: Dict):
+        self.name = event_abi["name"]
+        self.signature = abi_signature(event_abi)
+        self.topic = "0x" + keccak(text=self.signature).hex().removeprefix("0x")
+        self.indexed = [p for p in event_abi["inputs"] if p.get("indexed")]
+        self.non_indexed = [p for p in event_abi["inputs"] if not p.get("indexed")]
+        self.data_types = [abi_type_string(p) for p in self.non_indexed]
+
+    def decode(self, topics: List[Union[str, bytes]], data: Union[str, bytes]) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {}
+
+        # Indexed dynamic types (string, bytes, arrays, tuples) are stored as their keccak hash
+        for param, topic in zip(self.indexed, topics[1:]):
+            abi_type = abi_type_string(param)
+            raw = to_bytes(topic)
+            if abi_type in ("string", "bytes") or abi_type.endswith("]") or abi_type.startswith("("):
+                fields[param["name"]] = "0x" + raw.hex()
+            else:
+                fields[param["name"]] = abi_decode([abi_type], raw)[0]
+
+        values = abi_decode(self.data_types, to_bytes(data)) if self.data_types else ()
+        for param, value in zip(self.non_indexed, values):
+            fields[param["name"]] = value
+
+        for name, value in fields.items():
+            if isinstance(value, str) and len(value) == 42 and value.startswith("0x"):
+                fields[name] = to_checksum_address(value)
+        return fields
+
+
+class EventIndex:
+    """Decoders for every event in an ABI, keyed by topic hash and built once"""
+
+    def __init__(self, abi: List[Dict]):
+        self.by_topic: Dict[str, EventDecoder] = {}
+        self.by_name: Dict[str, EventDecoder] = {}
+        for item in abi:
+            if item.get("type") == "event" and not item.get("anonymous"):
+                decoder = EventDecoder(item)
+                self.by_topic[decoder.topic] = decoder
+                self.by_name[decoder.name] = decoder
+
+    def topic(self, event_name: str) -> str:
+        return self.by_name[event_name].topic
+
+    def decode_log(self, log: Any) -> Optional[Dict[str, Any]]:
+        """Decode a log if its first topic belongs to a known event"""
+        if not log.topics:
+            return None
+        topic0 = log.topics[0]
+        topic0 = topic0.lower() if isinstance(topic0, str) else "0x" + bytes(topic0).hex()
+        decoder = self.by_topic.get(topic0)
+        if decoder is None:
+            return None
+
+        event = decoder.decode(log.topics, log.data)
+        event["event"] = decoder.name
+        event["transactionHash"] = getattr(log, "transaction_hash", None)
+        event["blockNumber"] = getattr(log, "block_number", None)
+        return event
+
+    def decode_receipt(self, receipt: Any, event_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Decode all known events in a receipt, optionally keeping only one event type"""
+        events = []
+        for log in receipt.logs:
+            event = self.decode_log(log)
+            if event is not None and (event_name is None or event["event"] == event_name):
+                events.append(event)
+        return events
+
+
+# Topic index for the Clanker factory events, computed once at startup
+CLANKER_EVENTS = EventIndex(CLANKER_ABI)
+
+
+class FactoryLogWatcher:
+    """Confirms many deployments at once by scanning factory logs with eth_getLogs"""
+
+    def __init__(self, public_client: PublicClient, factory_address: Address, event_name: str = "TokenCreated",
+                 events: EventIndex = CLANKER_EVENTS, poll_interval: float = LOG_WATCH_INTERVAL,
+                 max_block_range: int = LOG_WATCH_MAX_BLOCKS):
+        self.public_client = public_client
+        self.factory_address = factory_address
+        self.event_name = event_name
+        self.events = events
+        self.poll_interval = poll_interval
+        self.max_block_range = max_block_range
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._next_block: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def wait_for(self, tx_hash: str) -> Dict[str, Any]:
+        """Wait until the factory emits the watched event from the given transaction"""
+        if self._next_block is None:
+            # Start a few blocks back so a transaction mined while registering is not missed
+            self._next_block = max(0, await self.public_client.get_block_number() - 2)
+
+        key = tx_hash.lower()
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self._pending.pop(key, None)
+            raise
+
+    async def scan(self, from_block: int, to_block: int) -> int:
+        """Fetch factory logs in a block range and resolve waiters; returns events matched"""
+        logs = await self.public_client.get_logs(
+            address=self.factory_address,
+            from_block=from_block,
+            to_block=to_block,
+            topics=[self.events.topic(self.event_name)]
+        )
+        matched = 0
+        for log in logs:
+            event = self.events.decode_log(log)
+            if event is None or not event["transactionHash"]:
+                continue
+            tx_hash = event["transactionHash"]
+            tx_hash = tx_hash.lower() if isinstance(tx_hash, str) else "0x" + bytes(tx_hash).hex()
+            future = self._pending.pop(tx_hash, None)
+            if future is not None and not future.done():
+                future.set_result(event)
+                matched += 1
+        return matched
+
+    async def _run(self):
+        while self._pending:
+            try:
+                latest = await self.public_client.get_block_number()
+                while self._next_block <= latest and self._pending:
+                    to_block = min(latest, self._next_block + self.max_block_range - 1)
+                    await self.scan(self._next_block, to_block)
+                    self._next_block = to_block + 1
+            except Exception as e:
+                logger.error(f"Error scanning factory logs: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+        # Nothing left to watch; the next waiter restarts from the current block
+        self._next_block = None
+
+
+class NonceManager:
+    """Hands out sequential nonces for one account so transactions can be in flight together.
+
+    Every reserved nonce is either finished, once its transaction is mined,
+    or released when sending failed. A released nonce is handed out again
+    before new ones, so later transactions don't stall behind the gap; only
+    when nothing else is reserved is the counter re-read from the chain.
+    """
+
+    def __init__(self, public_client: PublicClient, address: Address):
+        self.public_client = public_client
+        self.address = address
+        self._next_nonce: Optional[int] = None
+        self._reserved: Set[int] = set()
+        self._free: List[int] = []  # Heap of released nonces
+        self._lock = asyncio.Lock()
+
+    async def next_nonce(self) -> int:
+        """Reserve the lowest released nonce, or the next new one, reading the pending count on first use"""
+        async with self._lock:
+            if self._free:
+                nonce = heapq.heappop(self._free)
+            else:
+                if self._next_nonce is None:
+                    self._next_nonce = await self.public_client.get_transaction_count(
+                        address=self.address, block_tag="pending"
+                    )
+                nonce = self._next_nonce
+                self._next_nonce += 1
+            self._reserved.add(nonce)
+            return nonce
+
+    async def finish(self, nonce: int):
+        """Mark a reserved nonce as used by a mined transaction"""
+        async with self._lock:
+            self._reserved.discard(nonce)
+
+    async def release(self, nonce: int):
+        """Give back a reserved nonce whose transaction failed"""
+        async with self._lock:
+            self._reserved.discard(nonce)
+            if not self._reserved:
+                # Nothing else in flight, so the chain's pending count is safe to use, and covers a
+                # transaction that was broadcast after all
+                self._next_nonce = None
+                self._free.clear()
+            else:
+                heapq.heappush(self._free, nonce)
+
+    async def resync(self):
+        """Forget the local counter so the next nonce is read from the chain again, unless nonces are in flight"""
+        async with self._lock:
+            if not self._reserved:
+                self._next_nonce = None
+                self._free.clear()
+
+
+class GasScheduler:
+    """Admits deployments only while the base fee is under a cap, a batch per fee check.
+
+    Base-fee history for the last GAS_HISTORY_BLOCKS blocks is refreshed at
+    most every poll_interval seconds. While the latest base fee is above the
+    cap, admit() refuses, and the caller should retry later. Once it drops,
+    at most batch_size deployments are admitted per refresh, so a backlog
+    drains at a bounded rate. A deployment that has waited max_wait seconds
+    is admitted whatever the fee.
+    """
+
+    def __init__(self, public_client: PublicClient, cap_gwei: float = DEPLOY_BASE_FEE_CAP_GWEI,
+                 max_wait: float = DEPLOY_MAX_GAS_WAIT, batch_size: int = DEPLOY_RELEASE_BATCH,
+                 poll_interval: float = GAS_POLL_INTERVAL, history_blocks: int = GAS_HISTORY_BLOCKS):
+        self.public_client = public_client
+        self.cap = int(cap_gwei * 10 ** 9)
+        self.max_wait = max_wait
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.history: deque = deque(maxlen=max(1, history_blocks))
+        self._refreshed_at = 0.0
+        self._released = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def base_fee(self) -> Optional[int]:
+        return self.history[-1] if self.history else None
+
+    @property
+    def median_base_fee(self) -> Optional[int]:
+        if not self.history:
+            return None
+        return sorted(self.history)[len(self.history) // 2]
+
+    async def refresh(self):
+        """Fetch recent base fees unless they were fetched within poll_interval"""
+        async with self._lock:
+            if time.monotonic() - self._refreshed_at < self.poll_interval:
+                return
+            with rpc_priority(PRIORITY_PUBLISH):
+                history = await self.public_client.get_fee_history(
+                    block_count=self.history.maxlen, block_tag="latest", reward_percentiles=[]
+                )
+            self.history.clear()
+            # The last entry is the base fee of the next block
+            self.history.extend(history.base_fee_per_gas)
+            self._refreshed_at = time.monotonic()
+            self._released = 0
+            BASE_FEE.set(self.base_fee / 10 ** 9)
+
+    async def admit(self, waited: float = 0.0) -> bool:
+        """Whether a deployment that has waited `waited` seconds may be sent now"""
+        if waited >= self.max_wait:
+            logger.warning("Deployment waited %.0fs for gas under the cap; sending anyway", waited)
+            return True
+
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Without fee data the cap can't be enforced; fall back to sending
+            logger.warning("Could not fetch base fees, not holding deployment: %s", e)
+            return True
+
+        if self.base_fee <= self.cap and self._released < self.batch_size:
+            self._released += 1
+            return True
+
+        DEPLOYS_DEFERRED.inc()
+        logger.info("Holding deployment: base fee %.4f gwei (median %.4f) above cap %.4f gwei or batch full",
+                    self.base_fee / 10 ** 9, self.median_base_fee / 10 ** 9, self.cap / 10 ** 9)
+        return False
+
+
+class SaltPool:
+    """Random deployment salts generated ahead of time in bulk, refilled off the deploy path"""
+
+    def __init__(self, size: int = SALT_POOL_SIZE):
+        self.size = max(1, size)
+        self._salts: deque = deque()
+        self._refill_scheduled = False
+        self._fill()
+
+    def _fill(self):
+        self._refill_scheduled = False
+        missing = self.size - len(self._salts)
+        if missing > 0:
+            data = secrets.token_bytes(32 * missing)
+            self._salts.extend(data[i:i + 32] for i in range(0, len(data), 32))
+
+    def take(self) -> bytes:
+        if not self._salts:
+            self._fill()
+        salt = self._salts.popleft()
+        if len(self._salts) < self.size // 2 and not self._refill_scheduled:
+            try:
+                asyncio.get_running_loop().call_soon(self._fill)
+                self._refill_scheduled = True
+            except RuntimeError:
+                self._fill()
+        return salt
+
+    def __len__(self) -> int:
+        return len(self._salts)
+
+
+class DeploymentTemplate:
+    """deployToken calldata with everything except the token fields encoded once.
+
+    tokenConfig is the only dynamic member of the deployment config, and it
+    comes first, so the head of the encoding (its offset followed by the
+    static vault, pool, initial-buy and rewards configs) is the same for
+    every deployment from a wallet. Per deployment only tokenConfig is
+    encoded and appended to that cached prefix.
+    """
+
+    INITIAL_BUY = "0.01"  # ETH
+    STATIC_FIELDS = ("vaultConfig", "poolConfig", "initialBuyConfig", "rewardsConfig")
+
+    def __init__(self, wallet_address: Address, chain_id: int = 8453, abi: List[Dict] = CLANKER_ABI):
+        function = next(item for item in abi if item.get("type") == "function" and item["name"] == "deployToken")
+        fields = {field["name"]: field for field in function["inputs"][0]["components"]}
+
+        self.chain_id = chain_id
+        self.value = parseEther(self.INITIAL_BUY)
+        self.tick = self.calculate_tick()
+        self.config = {
+            "vaultConfig": {
+                "vaultPercentage": 30,  # 30% vault
+                "vaultDuration": 60 * 24 * 60 * 60,  # 60 days
+            },
+            "poolConfig": {
+                "pairedToken": "0x4200000000000000000000000000000000000006",  # WETH on Base
+                "tickIfToken0IsNewToken": self.tick,
+            },
+            "initialBuyConfig": {
+                "pairedTokenPoolFee": 10000,  # 1% fee
+                "pairedTokenSwapAmountOutMinimum": parseEther(self.INITIAL_BUY),  # 0.01 ETH minimum
+            },
+            "rewardsConfig": {
+                "creatorReward": 40,  # 40% creator reward
+                "creatorAdmin": wallet_address,
+                "creatorRewardRecipient": wallet_address,
+                "interfaceAdmin": wallet_address,
+                "interfaceRewardRecipient": wallet_address,
+            }
+        }
+
+        self.token_config_type = abi_type_string(fields["tokenConfig"])
+        static_types = [abi_type_string(fields[name]) for name in self.STATIC_FIELDS]
+        static_values = [
+            tuple(self.config[name][c["name"]] for c in fields[name]["components"]) for name in self.STATIC_FIELDS
+        ]
+        static_head = abi_encode(static_types, static_values)
+        selector = keccak(text=abi_signature(function))[:4]
+        # Selector, offset of the config tuple, offset of tokenConfig within it, then the static configs
+        self.prefix = selector + abi_encode(["uint256", "uint256"], [32, 32 + len(static_head)]) + static_head
+
+    @staticmethod
+    def calculate_tick() -> int:
+        """Calculate appropriate tick for token"""
+        desiredPrice = 0.0000000001
+        logBase = 1.0001
+        tickSpacing = 200
+        rawTick = int(math.log(desiredPrice) / math.log(logBase))
+        initialTick = (rawTick // tickSpacing) * tickSpacing
+        return initialTick
+
+    def token_config(self, name: str, symbol: str, salt: bytes, image_url: str, metadata: str,
+                     context: str) -> Tuple:
+        return (name, symbol, salt, image_url, metadata, context, self.chain_id)
+
+    def encode(self, token_config: Tuple) -> bytes:
+        """Full deployToken calldata for one token"""
+        # A lone dynamic tuple encodes as an offset word followed by the tuple itself
+        return self.prefix + abi_encode([self.token_config_type], [token_config])[32:]
+
+
+class ClankerDeployer:
+    """Client for deploying tokens using the Clanker SDK"""
+    
+    def __init__(self, wallet_client: WalletClient, public_client: PublicClient, factory_address: Address,
+                 nonce_manager: Optional[NonceManager] = None, max_pending: int = MAX_PENDING_DEPLOYS,
+                 log_watcher: Optional[FactoryLogWatcher] = None, governor: Optional[RateGovernor] = None,
+                 rate_key: str = urlsplit(RPC_URL).netloc, max_fee_gwei: float = DEPLOY_MAX_FEE_GWEI):
+        self.wallet_client = wallet_client
+        self.public_client = public_client
+        self.factory_address = factory_address
+        self.log_watcher = log_watcher
+        self.governor = governor
+        self.rate_key = rate_key
+        self.max_fee_per_gas = int(max_fee_gwei * 10 ** 9) or None
+        self.nonces = nonce_manager
+        if self.nonces is None and wallet_client.account:
+            self.nonces = NonceManager(public_client, wallet_client.account.address)
+        self._pending = asyncio.Semaphore(max_pending)
+        self.salts = SaltPool()
+        self.template = None
+        if wallet_client.account:
+            chain_id = public_client.chain_id if hasattr(public_client, 'chain_id') else 8453
+            self.template = DeploymentTemplate(wallet_client.account.address, chain_id)
+        
+    @contextlib.asynccontextmanager
+    async def throttle(self, priority: int):
+        """Make the RPC calls inside the block at priority.
+
+        A batching transport charges the rate budget itself at that
+        priority; the governor is only given here for a transport that
+        isn't governed, and its budget is then waited for once per block.
+        """
+        if self.governor is not None:
+            await self.governor.acquire(self.rate_key, priority)
+        with rpc_priority(priority):
+            yield
+
+    async def deploy_token(self, name: str, symbol: str, image_url: str, description: str,
+                           on_submitted: Optional[Callable[[str], None]] = None) -> str:
+        """Deploy a token using the Clanker SDK.
+
+        on_submitted is called with every transaction hash as soon as it is
+        broadcast, so callers can persist it before waiting for confirmation.
+        """
+        if not self.wallet_client.account:
+            raise ValueError("Wallet account not configured")
+        
+        # Only the token fields are encoded per deployment; the rest of the calldata is precomputed
+        now = int(time.time())
+        token_config = self.template.token_config(
+            name=name,
+            symbol=symbol,
+            salt=self.salts.take(),
+            image_url=image_url,
+            metadata=json.dumps({
+                "description": description,
+                "socialMediaUrls": [],
+                "auditUrls": []
+            }),
+            context=json.dumps({
+                "interface": "Farcaster-Zora Bot",
+                "platform": "Farcaster",
+                "messageId": f"farcaster-{now}",
+                "id": f"farcaster-{now}"
+            })
+        )
+        request = {
+            "account": self.wallet_client.account.address,
+            "to": self.factory_address,
+            "data": "0x" + self.template.encode(token_config).hex(),
+            "value": self.template.value,  # Initial buy amount
+        }
+        
+        try:
+            async with self._pending:
+                # Simulate contract call
+                async with self.throttle(PRIORITY_PUBLISH):
+                    with CALL_LATENCY.time(call="simulate"):
+                        await self.public_client.call(**request)
+                
+                # Execute contract call and wait for it (or a fee-bumped replacement) to be confirmed
+                confirm = self.log_watcher.wait_for if self.log_watcher else None
+                tx_hash, confirmation = await self.send_transaction(request, confirm, on_submitted)
+            
+            return self.token_from_confirmation(tx_hash, confirmation)
+            
+        except Exception as e:
+            logger.error("Error deploying token via Clanker: %s", e)
+            raise
+
+    def token_from_confirmation(self, tx_hash: str, confirmation: Any, from_logs: Optional[bool] = None) -> str:
+        """Read the token address from a receipt or from a TokenCreated event found by the log watcher"""
+        if from_logs is None:
+            from_logs = self.log_watcher is not None
+        if from_logs:
+            event = confirmation
+        else:
+            if receipt_reverted(confirmation):
+                raise TransactionReverted(tx_hash)
+            events = CLANKER_EVENTS.decode_receipt(confirmation, "TokenCreated")
+            if not events:
+                raise Exception("Failed to find token address in transaction logs")
+            event = events[0]
+
+            # Log-watcher events carry no gas data, so gas is only tracked from receipts
+            gas_used = getattr(confirmation, "gas_used", None)
+            if gas_used is not None:
+                DEPLOY_GAS_USED.observe(gas_used)
+                DEPLOY_GAS_SPENT.inc(gas_used * (getattr(confirmation, "effective_gas_price", None) or 0))
+
+        logger.info(
+            f"Token {event['tokenAddress']} created in {tx_hash} "
+            f"(position {event['positionId']}, bought {event['amountTokensBought']})"
+        )
+        return event["tokenAddress"]
+
+    async def confirm_deployment(self, tx_hashes: List[str], timeout: float = DEPLOY_RECEIPT_TIMEOUT) -> str:
+        """Wait for any of the already broadcast transactions of a deployment, without sending anything.
+
+        These were recorded by an earlier run and may have been mined while
+        the bot was down, before the log watcher's starting block, so they
+        are always confirmed from their receipts.
+        """
+        confirm = self.public_client.wait_for_transaction_receipt
+        watchers = {asyncio.create_task(confirm(tx_hash)): tx_hash for tx_hash in tx_hashes}
+        try:
+            pending = set(watchers)
+            deadline = time.monotonic() + timeout
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        return self.token_from_confirmation(watchers[task], task.result(), from_logs=False)
+            raise TimeoutError(f"None of {len(tx_hashes)} deployment transaction(s) confirmed")
+        finally:
+            for task in watchers:
+                task.cancel()
+
+    async def find_reverted(self, tx_hashes: List[str]) -> Optional[str]:
+        """Return the first already broadcast transaction that was mined but reverted"""
+        for tx_hash in tx_hashes:
+            try:
+                async with self.throttle(PRIORITY_CONFIRM):
+                    receipt = await self.public_client.get_transaction_receipt(tx_hash)
+            except Exception:
+                continue  # Not mined yet
+            if receipt is not None and receipt_reverted(receipt):
+                return tx_hash
+        return None
+
+    async def send_transaction(self, request: Dict[str, Any],
+                               confirm: Optional[Callable[[str], Awaitable[Any]]] = None,
+                               on_submitted: Optional[Callable[[str], None]] = None) -> Tuple[str, Any]:
+        """Send a transaction with a locally managed nonce and wait for it to be confirmed.
+
+        Confirmation defaults to the transaction receipt; confirm can be any
+        coroutine taking a tx hash, such as FactoryLogWatcher.wait_for. If no
+        confirmation arrives within DEPLOY_RECEIPT_TIMEOUT, the transaction is
+        replaced at the same nonce with fees bumped by DEPLOY_GAS_BUMP_PERCENT,
+        but never above DEPLOY_MAX_FEE_GWEI; at the ceiling it keeps waiting.
+        Every broadcast hash is watched, since any of them may be the one mined.
+        Before each replacement the receipts of the sent hashes are checked, and
+        TransactionReverted is raised if one was mined but reverted: log
+        confirmation never fires for it and its nonce can't be replaced.
+        """
+        confirm = confirm or self.public_client.wait_for_transaction_receipt
+        async with self.throttle(PRIORITY_PUBLISH):
+            nonce = await self.nonces.next_nonce()
+        watchers: Dict[asyncio.Task, str] = {}
+        sent: List[str] = []
+        try:
+            async with self.throttle(PRIORITY_PUBLISH):
+                fees = await self.public_client.estimate_fees_per_gas()
+            max_fee = fees.max_fee_per_gas
+            if self.max_fee_per_gas:
+                max_fee = min(max_fee, self.max_fee_per_gas)
+            priority_fee = min(fees.max_priority_fee_per_gas, max_fee)
+            resend = True
+
+            for attempt in range(DEPLOY_MAX_REPLACEMENTS + 1):
+                if resend:
+                    async with self.throttle(PRIORITY_CONFIRM if attempt else PRIORITY_PUBLISH):
+                        with CALL_LATENCY.time(call="write"):
+                            tx_hash = await self.wallet_client.send_transaction(
+                                **request,
+                                nonce=nonce,
+                                max_fee_per_gas=max_fee,
+                                max_priority_fee_per_gas=priority_fee
+                            )
+                    logger.info("Token deployment transaction sent: %s (nonce %s, attempt %s)", tx_hash, nonce,
+                                attempt + 1, extra={"tx_hash": tx_hash, "nonce": nonce})
+                    if on_submitted is not None:
+                        on_submitted(tx_hash)
+                    sent.append(tx_hash)
+                    async with self.throttle(PRIORITY_CONFIRM):
+                        watchers[asyncio.create_task(confirm(tx_hash))] = tx_hash
+                    if attempt == 0:
+                        sent_at = time.perf_counter()
+
+                done, _ = await asyncio.wait(
+                    watchers, timeout=DEPLOY_RECEIPT_TIMEOUT, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        CALL_LATENCY.observe(time.perf_counter() - sent_at, call="receipt_wait")
+                        await self.nonces.finish(nonce)
+                        return watchers[task], task.result()
+                    watchers.pop(task)
+
+                reverted = await self.find_reverted(sent)
+                if reverted is not None:
+                    raise TransactionReverted(reverted)
+
+                # Stuck (or every watcher failed): replace with higher fees at the same nonce
+                bumped_max_fee = max_fee * (100 + DEPLOY_GAS_BUMP_PERCENT) // 100
+                if self.max_fee_per_gas:
+                    bumped_max_fee = min(bumped_max_fee, self.max_fee_per_gas)
+                # A replacement needs a real fee increase; at the ceiling keep waiting on what was sent
+                resend = bumped_max_fee > max_fee
+                if resend:
+                    max_fee = bumped_max_fee
+                    priority_fee = min(priority_fee * (100 + DEPLOY_GAS_BUMP_PERCENT) // 100, max_fee)
+                    logger.warning("Transaction with nonce %s not mined after %ss, bumping fees", nonce,
+                                   DEPLOY_RECEIPT_TIMEOUT)
+                else:
+                    logger.warning("Transaction with nonce %s not mined after %ss, fees already at the %s gwei ceiling",
+                                   nonce, DEPLOY_RECEIPT_TIMEOUT, DEPLOY_MAX_FEE_GWEI)
+                    # Rebroadcasting at the same fee would be rejected as underpriced; watch the sent hashes again
+                    with rpc_priority(PRIORITY_CONFIRM):
+                        for tx_hash in sent:
+                            if tx_hash not in watchers.values():
+                                watchers[asyncio.create_task(confirm(tx_hash))] = tx_hash
+
+            raise TimeoutError(f"Transaction with nonce {nonce} not mined after {DEPLOY_MAX_REPLACEMENTS + 1} attempts")
+        except TransactionReverted:
+            await self.nonces.finish(nonce)  # Mined, so the nonce is spent
+            raise
+        except Exception:
+            # The nonce may never have been used; hand it out again so later transactions don't stall behind a gap
+            await self.nonces.release(nonce)
+            raise
+        finally:
+            for task in watchers:
+                task.cancel()
+
+
+class WalletShard:
+    """One signer account with its own wallet client, nonce tracking and deployer"""
+
+    def __init__(self, account: Any, wallet_client: WalletClient, deployer: ClankerDeployer):
+        self.account = account
+        self.address = account.address
+        self.wallet_client = wallet_client
+        self.deployer = deployer
+        self.balance: Optional[int] = None  # Wei; None until the first balance check
+        self.active = 0  # Deployments currently sending from this wallet
+
+
+class WalletPool:
+    """Signer wallets that deployments are spread across.
+
+    Jobs are assigned by rendezvous hashing of a shard key (author, channel
+    or cast), so the same key keeps landing on the same wallet and taking a
+    wallet out of rotation only moves the keys that were on it. Wallets are
+    taken out of rotation while their balance is below min_balance and put
+    back once topped up. When workers share the wallets, owned holds the
+    addresses this worker has leased and only those are assigned.
+    """
+
+    def __init__(self, shards: List[WalletShard], public_client: PublicClient,
+                 min_balance_eth: float = WALLET_MIN_BALANCE_ETH, check_interval: float = BALANCE_CHECK_INTERVAL):
+        self.shards = shards
+        self.public_client = public_client
+        self.min_balance = parseEther(str(min_balance_eth))
+        self.check_interval = check_interval
+        self.owned: Optional[Set[str]] = None  # None = every wallet belongs to this process
+        self._task: Optional[asyncio.Task] = None
+
+    def funded(self, shard: WalletShard) -> bool:
+        return shard.balance is None or shard.balance >= self.min_balance
+
+    def assign(self, key: str) -> Optional[WalletShard]:
+        """Wallet for a shard key, or None when every owned wallet is underfunded"""
+        candidates = [
+            shard for shard in self.shards
+            if self.funded(shard) and (self.owned is None or shard.address in self.owned)
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda shard: hashlib.sha256(f"{shard.address}:{key}".encode()).digest())
+
+    async def refresh_balances(self):
+        # Background check, so it yields to deployments and confirmations
+        with rpc_priority(PRIORITY_DISCOVERY):
+            balances = await asyncio.gather(
+                *(self.public_client.get_balance(address=shard.address) for shard in self.shards),
+                return_exceptions=True
+            )
+        for shard, balance in zip(self.shards, balances):
+            if isinstance(balance, Exception):
+                logger.warning("Could not check balance of wallet %s: %s", shard.address, balance)
+                continue
+            was_funded = self.funded(shard)
+            shard.balance = balance
+            WALLET_BALANCE.set(balance / 10 ** 18, wallet=shard.address)
+            if was_funded and not self.funded(shard):
+                logger.warning("Wallet %s has %.4f ETH, below the %.4f ETH minimum; routing its deployments elsewhere",
+                               shard.address, balance / 10 ** 18, self.min_balance / 10 ** 18)
+            elif not was_funded and self.funded(shard):
+                logger.info("Wallet %s is funded again (%.4f ETH)", shard.address, balance / 10 ** 18)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.refresh_balances()
+            await asyncio.sleep(self.check_interval)
+
+
+# Deduplication stores for processed cast hashes
+class BloomFilter:
+    """Fixed-size Bloom filter used to skip lookups for hashes never seen"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupStore(ABC):
+    """Interface for stores that remember which casts were already processed"""
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add(self, key: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class MemoryDedupStore(DedupStore):
+    """In-memory dedup store with LRU and TTL eviction; does not survive restarts"""
+
+    def __init__(self, max_entries: int = DEDUP_MAX_ENTRIES, ttl: float = DEDUP_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        seen_at = self._entries.get(key)
+        if seen_at is None:
+            return False
+        if time.time() - seen_at > self.ttl:
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def add(self, key: str, seen_at: Optional[float] = None):
+        self._entries[key] = time.time() if seen_at is None else seen_at
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteDedupStore(DedupStore):
+    """SQLite-backed dedup store with an LRU cache and optional Bloom filter in front.
+
+    The cache only ever answers "seen", so it stays correct when other
+    processes write to the same file. The Bloom filter answers "never seen"
+    from what this process loaded and added, so it must be off when the
+    file is shared.
+    """
+
+    PRUNE_EVERY = 1000  # Inserts between eviction passes
+
+    def __init__(
+        self,
+        path: str = DEDUP_DB_PATH,
+        max_entries: int = DEDUP_MAX_ENTRIES,
+        ttl: float = DEDUP_TTL,
+        cache_size: int = DEDUP_CACHE_SIZE,
+        use_bloom: bool = ENABLE_DEDUP_BLOOM
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_bloom = use_bloom
+        self._cache = MemoryDedupStore(max_entries=cache_size, ttl=ttl)
+        self._inserts = 0
+        self._bloom: Optional[BloomFilter] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed (hash TEXT PRIMARY KEY, seen_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS processed_seen_at ON processed (seen_at)")
+        self._db.commit()
+
+        self.prune()
+        self._warm_up()
+
+    def _warm_up(self):
+        """Load the Bloom filter and the most recent hashes into memory"""
+        if self.use_bloom:
+            self._bloom = BloomFilter(self.max_entries)
+            for (key,) in self._db.execute("SELECT hash FROM processed"):
+                self._bloom.add(key)
+
+        recent = self._db.execute(
+            "SELECT hash, seen_at FROM processed ORDER BY seen_at DESC LIMIT ?", (self._cache.max_entries,)
+        ).fetchall()
+        for key, seen_at in reversed(recent):
+            self._cache.add(key, seen_at)
+        logger.info(f"Loaded dedup store {self.path} ({len(self)} processed casts)")
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._cache:
+            return True
+        if self._bloom is not None and key not in self._bloom:
+            return False
+
+        row = self._db.execute("SELECT seen_at FROM processed WHERE hash = ?", (key,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return False
+        self._cache.add(key)
+        return True
+
+    def add(self, key: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO processed (hash, seen_at) VALUES (?, ?)", (key, time.time())
+        )
+        self._db.commit()
+        self._cache.add(key)
+        if self._bloom is not None:
+            self._bloom.add(key)
+
+        self._inserts += 1
+        if self._inserts % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Evict hashes past the TTL, then the oldest ones beyond max_entries"""
+        self._db.execute("DELETE FROM processed WHERE seen_at < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM processed WHERE hash IN "
+            "(SELECT hash FROM processed ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+
+        # Evicted hashes stay set in the Bloom filter, so rebuild it once it has seen far more than it holds
+        if self._bloom is not None and self._inserts >= 2 * self.max_entries:
+            self._inserts = 0
+            self._warm_up()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+def create_dedup_store(backend: str = DEDUP_BACKEND) -> DedupStore:
+    """Create the dedup store selected by DEDUP_BACKEND"""
+    if backend == "memory":
+        return MemoryDedupStore()
+    if backend == "sqlite":
+        # Partitioned workers share the file, and a per-process Bloom filter would miss their hashes
+        return SQLiteDedupStore(use_bloom=ENABLE_DEDUP_BLOOM and not ENABLE_PARTITIONING)
+    raise ValueError(f"Unknown dedup backend: {backend}")
+
+
+# Perceptual hashing for near-duplicate image detection
+PHASH_SIZE = 32  # Images are reduced to PHASH_SIZE x PHASH_SIZE grayscale before the DCT
+PHASH_BITS = 8  # The top-left PHASH_BITS x PHASH_BITS DCT coefficients form the 64-bit hash
+
+# Orthonormal DCT-II basis, so the 2D DCT of an image is two matrix products
+_DCT_MATRIX = np.sqrt(2 / PHASH_SIZE) * np.cos(
+    np.pi * np.outer(np.arange(PHASH_SIZE), 2 * np.arange(PHASH_SIZE) + 1) / (2 * PHASH_SIZE)
+)
+_DCT_MATRIX[0] /= np.sqrt(2)
+_PHASH_WEIGHTS = 1 << np.arange(PHASH_BITS * PHASH_BITS - 1, -1, -1, dtype=np.uint64)
+
+
+def compute_phash(data: Union[bytes, str]) -> int:
+    """64-bit DCT perceptual hash of an encoded image, given as bytes or a file path"""
+    with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data) as image:
+        image.draft("L", (PHASH_SIZE * 4, PHASH_SIZE * 4))  # Let JPEG decode at reduced size
+        pixels = np.asarray(
+            image.convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64
+        )
+
+    dct = _DCT_MATRIX @ pixels @ _DCT_MATRIX.T
+    low = dct[:PHASH_BITS, :PHASH_BITS].ravel()
+    # Compare against the median of the AC coefficients; the DC term only encodes brightness
+    bits = low > np.median(low[1:])
+    return int(np.sum(_PHASH_WEIGHTS[bits], dtype=np.uint64))
+
+
+class PerceptualHashIndex:
+    """Persistent near-neighbour index of image hashes using multi-index hashing.
+
+    Each 64-bit hash is split into threshold + 1 chunks. By the pigeonhole
+    principle two hashes within the Hamming threshold share at least one
+    chunk exactly, so lookups only compare against hashes in the matching
+    chunk buckets instead of scanning the whole index.
+
+    With shared set, other processes add to the same file, and their
+    hashes are picked up from SQLite before every lookup.
+    """
+
+    REFRESH_OVERLAP = 60.0  # Seconds re-read on refresh, for rows committed after later-stamped ones
+
+    def __init__(self, path: str = IMAGE_HASH_DB_PATH, threshold: int = IMAGE_DEDUP_THRESHOLD, shared: bool = False):
+        self.path = path
+        self.threshold = threshold
+        self.shared = shared
+        self._loaded_until = 0.0  # Newest seen_at read from the file
+        chunks = threshold + 1
+        widths = [64 // chunks + (1 if i < 64 % chunks else 0) for i in range(chunks)]
+        self._chunks: List[Tuple[int, int]] = []  # (shift, mask) per chunk
+        shift = 64
+        for width in widths:
+            shift -= width
+            self._chunks.append((shift, (1 << width) - 1))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._chunks]
+        self._sources: Dict[int, str] = {}  # Hash -> cast hash that first used the image
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS image_hashes "
+            "(phash INTEGER PRIMARY KEY, cast_hash TEXT, image_url TEXT, seen_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS image_hashes_seen_at ON image_hashes (seen_at)")
+        self._db.commit()
+
+        self._load(0.0)
+        logger.info(f"Loaded image hash index {path} ({len(self)} images)")
+
+    def _load(self, since: float):
+        rows = self._db.execute("SELECT phash, cast_hash, seen_at FROM image_hashes WHERE seen_at >= ?", (since,))
+        for phash, cast_hash, seen_at in rows:
+            self._insert(phash & 0xFFFFFFFFFFFFFFFF, cast_hash)
+            self._loaded_until = max(self._loaded_until, seen_at)
+
+    def refresh(self):
+        """Index hashes that other processes added since the last load"""
+        self._load(self._loaded_until - self.REFRESH_OVERLAP)
+
+    def _insert(self, phash: int, cast_hash: str):
+        if phash in self._sources:
+            return
+        self._sources[phash] = cast_hash
+        for (shift, mask), buckets in zip(self._chunks, self._buckets):
+            buckets.setdefault((phash >> shift) & mask, []).append(phash)
+
+    def find(self, phash: int, exclude_cast: Optional[str] = None) -> Optional[Tuple[int, str, int]]:
+        """Return (hash, cast hash, distance) of the closest indexed image within the threshold.
+
+        Images indexed for exclude_cast are ignored, so a cast resumed after
+        a restart does not match the hash it indexed itself.
+        """
+        if self.shared:
+            self.refresh()
+        best = None
+        for (shift, mask), buckets in zip(self._chunks, self._buckets):
+            for candidate in buckets.get((phash >> shift) & mask, ()):
+                if exclude_cast is not None and self._sources[candidate] == exclude_cast:
+                    continue
+                distance = (candidate ^ phash).bit_count()
+                if distance <= self.threshold and (best is None or distance < best[2]):
+                    best = (candidate, self._sources[candidate], distance)
+                    if distance == 0:
+                        return best
+        return best
+
+    def add(self, phash: int, cast_hash: str, image_url: str):
+        """Index an image hash and persist it"""
+        # SQLite integers are signed 64-bit
+        signed = phash - (1 << 64) if phash >= 1 << 63 else phash
+        self._db.execute(
+            "INSERT OR IGNORE INTO image_hashes (phash, cast_hash, image_url, seen_at) VALUES (?, ?, ?, ?)",
+            (signed, cast_hash, image_url, time.time())
+        )
+        self._db.commit()
+        self._insert(phash, cast_hash)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def close(self):
+        self._db.close()
+
+
+# Content-addressed local copies of verified images
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> str:
+    """Content type of an image from its first bytes"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ImageStore:
+    """Disk cache of downloaded images keyed by the SHA-256 of their content.
+
+    Each image is streamed to disk in chunks while it is hashed, so it is
+    never held in memory whole, and identical images from different URLs
+    are stored once. A SQLite index maps URLs to digests, so an image is
+    downloaded only once however often it is referenced. Past max_bytes the
+    least recently used images are evicted. With a public_url, the images
+    are also served over HTTP for local consumers. The copies are never
+    published as a token's image: they can be evicted and are unavailable
+    while the bot is down, so mints keep the original URL.
+    """
+
+    def __init__(self, http_client: AsyncHTTPClient, directory: str = IMAGE_STORE_DIR,
+                 max_bytes: int = IMAGE_STORE_MAX_BYTES, max_image_bytes: int = IMAGE_MAX_BYTES,
+                 public_url: str = IMAGE_STORE_PUBLIC_URL, host: str = IMAGE_STORE_HOST, port: int = IMAGE_STORE_PORT):
+        self.http = http_client
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self.public_url = public_url.rstrip("/")
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "content_type TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used)")
+        self._db.commit()
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        IMAGE_STORE_BYTES.set(self.total_bytes)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def content_type(self, digest: str) -> Optional[str]:
+        row = self._db.execute("SELECT content_type FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return None if row is None else row[0]
+
+    async def fetch(self, url: str) -> str:
+        """Make sure the image at url is stored and return its digest"""
+        row = self._db.execute("SELECT digest FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is not None and os.path.exists(self.path(row[0])):
+            self._touch(row[0])
+            IMAGE_STORE_FETCHES.inc(result="hit")
+            return row[0]
+        IMAGE_STORE_FETCHES.inc(result="miss")
+
+        temp_path = os.path.join(self.directory, f".download-{secrets.token_hex(8)}")
+        sha256 = hashlib.sha256()
+        size = 0
+        head = b""
+        try:
+            with CALL_LATENCY.time(call="image_download"), open(temp_path, "wb") as f:
+                async for chunk in self.http.stream(url):
+                    size += len(chunk)
+                    if size > self.max_image_bytes:
+                        raise ValueError(f"Image {url} exceeds {self.max_image_bytes} bytes")
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    sha256.update(chunk)
+                    f.write(chunk)
+
+            digest = sha256.hexdigest()
+            blob_path = self.path(digest)
+            if os.path.exists(blob_path):
+                os.remove(temp_path)  # Same content already stored from another URL
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(temp_path, blob_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO blobs (digest, size, content_type, last_used) VALUES (?, ?, ?, ?)",
+            (digest, size, sniff_image_type(head), time.time())
+        )
+        self._db.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+        self._db.commit()
+        if cursor.rowcount:
+            self.total_bytes += size
+            self.evict()
+        else:
+            self._touch(digest)
+        return digest
+
+    def _touch(self, digest: str):
+        self._db.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        self._db.commit()
+
+    def evict(self):
+        """Delete least recently used images until the store fits in max_bytes"""
+        # Other worker processes may share the directory, so count what is actually stored
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while self.total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT digest, size FROM blobs ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for digest, size in rows:
+                if os.path.exists(self.path(digest)):
+                    os.remove(self.path(digest))
+                self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+            self._db.commit()
+        IMAGE_STORE_BYTES.set(self.total_bytes)
+
+    async def start(self):
+        """Serve stored images over HTTP when a public URL is configured"""
+        if not self.public_url:
+            return
+        app = web.Application()
+        app.router.add_get("/images/{name}", self.handle_image)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving cached images on {self.host}:{self.port} as {self.public_url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_image(self, request: web.Request) -> web.StreamResponse:
+        digest = os.path.splitext(request.match_info["name"])[0]
+        content_type = self.content_type(digest) if re.fullmatch(r"[0-9a-f]{64}", digest) else None
+        if content_type is None or not os.path.exists(self.path(digest)):
+            raise web.HTTPNotFound()
+        # Content never changes for a digest, so downstream caches can keep it forever
+        return web.FileResponse(self.path(digest), headers={
+            "Content-Type": content_type,
+            "Cache-Control": "public, max-age=31536000, immutable",
+        })
+
+    def close(self):
+        self._db.close()
+
+
+class DeferJob(Exception):
+    """Raised by a job handler to run the job again later without counting a failed attempt"""
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason or f"deferred for {delay}s")
+        self.delay = delay
+
+
+class FailJob(Exception):
+    """Raised by a job handler to fail the job at once when retrying can't succeed"""
+
+
+class QueuedJob:
+    """A mint or deploy operation loaded from the job queue"""
+
+    __slots__ = ("id", "idempotency_key", "action", "payload", "state", "attempts", "tx_hashes", "created_at",
+                 "sent_at")
+
+    def __init__(self, id: int, idempotency_key: str, action: str, payload: Dict, state: str, attempts: int,
+                 tx_hashes: List[str], created_at: float = 0.0, sent_at: Optional[float] = None):
+        self.id = id
+        self.idempotency_key = idempotency_key
+        self.action = action
+        self.payload = payload
+        self.state = state
+        self.attempts = attempts
+        self.tx_hashes = tx_hashes
+        self.created_at = created_at
+        self.sent_at = sent_at  # When a request without a transaction hash was first sent, e.g. a Zora create
+
+
+class JobQueue:
+    """Durable SQLite (WAL) queue of mint and deploy jobs.
+
+    Jobs move pending -> running -> submitted -> confirmed, or back to
+    pending with exponential backoff on errors until JOB_MAX_ATTEMPTS, then
+    failed. Transaction hashes are recorded as soon as they are broadcast,
+    so a job interrupted after submitting is resumed by waiting for those
+    transactions instead of sending new ones. The idempotency key is unique,
+    so the same action for the same image is never queued twice.
+
+    With an owner set, several worker processes can share the file: claims
+    are atomic, each claimed job carries a lease the owner renews, and
+    recover_expired() requeues only jobs whose owner stopped renewing.
+    Claims use their own connection so they can wait for the write lock in
+    a thread instead of on the event loop.
+    """
+
+    STATES = ("pending", "running", "submitted", "confirmed", "failed")
+
+    def __init__(self, path: str = JOB_DB_PATH, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 retry_base: float = JOB_RETRY_BASE, retry_max: float = JOB_RETRY_MAX,
+                 owner: Optional[str] = None, lease_ttl: float = LEASE_TTL):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.owner = owner
+        self.lease_ttl = lease_ttl
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "idempotency_key TEXT NOT NULL UNIQUE, "
+            "action TEXT NOT NULL, "
+            "payload TEXT NOT NULL, "
+            "state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "run_at REAL NOT NULL, "
+            "tx_hashes TEXT NOT NULL DEFAULT '', "
+            "result TEXT, "
+            "last_error TEXT, "
+            "created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, "
+            "owner TEXT, "
+            "lease_until REAL NOT NULL DEFAULT 0, "
+            "sent_at REAL)"
+        )
+        # Queues created before leases were added lack the owner columns
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._db.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        if "sent_at" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN sent_at REAL")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, run_at)")
+        self._db.commit()
+        self._recover()
+
+        # Only used by claim(), one thread at a time
+        self._claim_db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._claim_lock = threading.Lock()
+
+    def _recover(self):
+        """Requeue jobs that were running or awaiting confirmation when the process stopped"""
+        if self.owner is None:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'pending', run_at = ?, updated_at = ? WHERE state IN ('running', 'submitted')",
+                (time.time(), time.time())
+            )
+        else:
+            # Other workers may still be running their jobs; only take back our own and expired ones
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'pending', owner = NULL, run_at = ?, updated_at = ? "
+                "WHERE state IN ('running', 'submitted') AND (owner = ? OR lease_until < ?)",
+                (time.time(), time.time(), self.owner, time.time())
+            )
+        self._db.commit()
+        if cursor.rowcount:
+            logger.info(f"Resuming {cursor.rowcount} interrupted job(s) from {self.path}")
+
+    def recover_expired(self, live_workers: Collection[str] = ()) -> int:
+        """Requeue jobs whose owner stopped renewing its lease; returns how many.
+
+        Jobs of workers in live_workers are left alone even when their lease
+        lapsed, since a worker that is still heartbeating may be running them.
+        """
+        now = time.time()
+        live = tuple(live_workers)
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = 'pending', owner = NULL, run_at = ?, updated_at = ? "
+            "WHERE state IN ('running', 'submitted') AND owner IS NOT NULL AND lease_until < ? "
+            f"AND owner NOT IN ({','.join('?' * len(live))})",
+            (now, now, now, *live)
+        )
+        self._db.commit()
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} job(s) abandoned by stopped workers")
+        return cursor.rowcount
+
+    def renew_leases(self):
+        """Extend the lease on every job this worker is running"""
+        if self.owner is None:
+            return
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND state IN ('running', 'submitted')",
+            (now + self.lease_ttl, self.owner)
+        )
+        self._db.commit()
+
+    def enqueue(self, action: str, idempotency_key: str, payload: Dict) -> bool:
+        """Add a job unless one with the same idempotency key exists; returns whether it was added"""
+        now = time.time()
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO jobs (idempotency_key, action, payload, state, run_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+            (idempotency_key, action, json.dumps(payload), now, now, now)
+        )
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    def claim(self, skip_actions: Collection[str] = ()) -> Optional[QueuedJob]:
+        """Take the next due pending job and mark it running, ignoring jobs for skip_actions.
+
+        Safe to call from any thread; it may wait up to 30 s for another
+        worker's write lock before raising sqlite3.OperationalError.
+        """
+        skipped = tuple(skip_actions)
+        with self._claim_lock:
+            return self._claim(skipped)
+
+    def _claim(self, skipped: Tuple[str, ...]) -> Optional[QueuedJob]:
+        db = self._claim_db
+        # Take the write lock before reading so two workers can never claim the same job
+        db.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        try:
+            row = db.execute(
+                "SELECT id, idempotency_key, action, payload, attempts, tx_hashes, created_at, sent_at FROM jobs "
+                "WHERE state = 'pending' AND run_at <= ? "
+                f"AND action NOT IN ({','.join('?' * len(skipped))}) ORDER BY run_at LIMIT 1",
+                (now, *skipped)
+            ).fetchone()
+            if row is None:
+                db.rollback()
+                return None
+
+            job_id, key, action, payload, attempts, tx_hashes, created_at, sent_at = row
+            db.execute(
+                "UPDATE jobs SET state = 'running', owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (self.owner, now + self.lease_ttl, now, job_id)
+            )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return QueuedJob(job_id, key, action, json.loads(payload), "running", attempts,
+                         [h for h in tx_hashes.split(",") if h], created_at, sent_at)
+
+    def mark_submitted(self, job: QueuedJob, tx_hash: str):
+        """Record a broadcast transaction before waiting for it"""
+        job.tx_hashes.append(tx_hash)
+        job.state = "submitted"
+        self._db.execute(
+            "UPDATE jobs SET state = 'submitted', tx_hashes = ?, updated_at = ? WHERE id = ?",
+            (",".join(job.tx_hashes), time.time(), job.id)
+        )
+        self._db.commit()
+
+    def mark_sent(self, job: QueuedJob):
+        """Record that a non-transaction request is about to be sent, so a rerun knows it may have landed"""
+        job.state = "submitted"
+        if job.sent_at is None:
+            job.sent_at = time.time()
+        self._db.execute(
+            "UPDATE jobs SET state = 'submitted', sent_at = ?, updated_at = ? WHERE id = ?",
+            (job.sent_at, time.time(), job.id)
+        )
+        self._db.commit()
+
+    def complete(self, job: QueuedJob, result: Any):
+        job.state = "confirmed"
+        self._db.execute(
+            "UPDATE jobs SET state = 'confirmed', result = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(result, default=str), time.time(), job.id)
+        )
+        self._db.commit()
+
+    def retry(self, job: QueuedJob, error: str):
+        """Schedule the job again with exponential backoff, or fail it after max_attempts"""
+        job.attempts += 1
+        now = time.time()
+        if job.attempts >= self.max_attempts:
+            job.state = "failed"
+            run_at = now
+        else:
+            job.state = "pending"
+            delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+            run_at = now + delay * random.uniform(0.8, 1.2)
+        self._db.execute(
+            "UPDATE jobs SET state = ?, attempts = ?, run_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (job.state, job.attempts, run_at, error, now, job.id)
+        )
+        self._db.commit()
+
+    def fail(self, job: QueuedJob, error: str):
+        """Fail the job without further attempts"""
+        job.attempts += 1
+        job.state = "failed"
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET state = 'failed', attempts = ?, run_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (job.attempts, now, error, now, job.id)
+        )
+        self._db.commit()
+
+    def defer(self, job: QueuedJob, delay: float):
+        """Put the job back as pending after delay seconds without counting an attempt"""
+        job.state = "pending"
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET state = 'pending', run_at = ?, updated_at = ? WHERE id = ?",
+            (now + delay, now, job.id)
+        )
+        self._db.commit()
+
+    def next_run_at(self) -> Optional[float]:
+        row = self._db.execute("SELECT MIN(run_at) FROM jobs WHERE state = 'pending'").fetchone()
+        return row[0]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state"""
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return counts
+
+    def close(self):
+        with self._claim_lock:
+            self._claim_db.close()
+        self._db.close()
+
+
+class JobWorkers:
+    """Pool of workers draining a JobQueue with one async handler per action"""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[QueuedJob], Awaitable[Any]]],
+                 workers: int = PUBLISH_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.skip_actions: Set[str] = set()  # Actions left for other workers, e.g. deploys without a wallet lease
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def notify(self):
+        """Wake idle workers after new jobs were enqueued"""
+        self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Waiting for the write lock happens off the event loop
+                job = await loop.run_in_executor(None, self.queue.claim, tuple(self.skip_actions))
+            except sqlite3.OperationalError as e:
+                logger.warning("Could not claim a job from %s, retrying in %ss: %s", self.queue.path,
+                               self.poll_interval, e)
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = await self.handlers[job.action](job)
+                self.queue.complete(job, result)
+                JOBS_FINISHED.inc(action=job.action, outcome="confirmed")
+            except asyncio.CancelledError:
+                raise  # Left running; requeued when the queue is reopened
+            except DeferJob as e:
+                self.queue.defer(job, e.delay)
+                JOBS_FINISHED.inc(action=job.action, outcome="deferred")
+            except FailJob as e:
+                self.queue.fail(job, str(e))
+                JOBS_FINISHED.inc(action=job.action, outcome="failed")
+                logger.error("Job %s failed: %s", job.idempotency_key, e)
+            except Exception as e:
+                self.queue.retry(job, str(e))
+                JOBS_FINISHED.inc(action=job.action, outcome=job.state if job.state == "failed" else "retried")
+                if job.state == "failed":
+                    logger.error("Job %s failed after %s attempts: %s", job.idempotency_key, job.attempts, e)
+                else:
+                    logger.warning("Job %s attempt %s failed, will retry: %s", job.idempotency_key, job.attempts, e)
+
+
+class ChannelState:
+    """Polling cursor and adaptive schedule for a single channel"""
+
+    def __init__(self, channel_id: str, interval: float = POLLING_INTERVAL):
+        self.channel_id = channel_id
+        self.last_processed_time = time.time()  # High-water cast timestamp, starting from now
+        self.last_cast_hash: Optional[str] = None  # Hash of the newest cast seen
+        self.interval = float(interval)
+        self.next_poll_at = 0.0
+        self.channel_info: Dict = {}
+        self.polls = 0
+        self.active_polls = 0
+
+    def record_poll(self, new_casts: int, min_interval: float, max_interval: float):
+        """Shorten the interval when the channel is active and back off while it is quiet"""
+        self.polls += 1
+        if new_casts:
+            self.active_polls += 1
+            self.interval = max(min_interval, self.interval / 2)
+        else:
+            self.interval = min(max_interval, self.interval * 1.25)
+
+
+class ChannelScheduler:
+    """Polls many channels from one event loop with bounded parallelism"""
+
+    def __init__(
+        self,
+        poll: Callable[[ChannelState], Awaitable[int]],
+        max_concurrency: int = MAX_CONCURRENT_POLLS,
+        min_interval: float = MIN_POLLING_INTERVAL,
+        max_interval: float = MAX_POLLING_INTERVAL
+    ):
+        self.poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.channels: Dict[str, ChannelState] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queue: List[tuple] = []  # Heap of (next_poll_at, sequence, channel_id)
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def add_channel(self, channel_id: str, interval: float = POLLING_INTERVAL) -> ChannelState:
+        """Register a channel and schedule its first poll immediately"""
+        if channel_id in self.channels:
+            return self.channels[channel_id]
+
+        state = ChannelState(channel_id, interval=min(self.max_interval, max(self.min_interval, interval)))
+        self.channels[channel_id] = state
+        self._schedule(state, 0.0)
+        return state
+
+    def remove_channel(self, channel_id: str):
+        """Stop polling a channel; its queued entry is discarded when it comes due"""
+        self.channels.pop(channel_id, None)
+
+    def _schedule(self, state: ChannelState, delay: float):
+        state.next_poll_at = asyncio.get_running_loop().time() + delay
+        self._sequence += 1
+        heapq.heappush(self._queue, (state.next_poll_at, self._sequence, state.channel_id))
+        self._wakeup.set()
+
+    async def run(self):
+        """Dispatch channel polls as they come due, forever"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            next_poll_at, _, channel_id = self._queue[0]
+            delay = next_poll_at - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            state = self.channels.get(channel_id)
+            if state is None or state.next_poll_at != next_poll_at:
+                continue  # Channel was removed or rescheduled
+
+            # Wait for a free slot so at most max_concurrency polls run at once
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._poll_channel(state))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _poll_channel(self, state: ChannelState):
+        new_casts = 0
+        try:
+            new_casts = await self.poll(state)
+        except Exception as e:
+            logger.error(f"Error polling channel /{state.channel_id}: {str(e)}")
+        finally:
+            self._semaphore.release()
+
+        if state.channel_id not in self.channels:
+            return
+
+        state.record_poll(new_casts, self.min_interval, self.max_interval)
+        # Spread polls out so channels with equal intervals don't fire together
+        delay = state.interval * random.uniform(0.9, 1.1)
+        logger.debug("Next poll of /%s in %.1f seconds", state.channel_id, delay)
+        self._schedule(state, delay)
+
+
+# Snapshot plus write-ahead log of polling state, for warm restarts
+class StateCheckpoint:
+    """Channel cursors, cached channel metadata and in-flight casts, kept across restarts.
+
+    Every change is appended to a write-ahead log as a length-prefixed,
+    checksummed record and flushed, so a crash loses nothing that was
+    recorded. Every snapshot_interval seconds, or once the log passes
+    wal_max_bytes, the whole state is written to a compact snapshot and the
+    log starts over. Records are encoded as MessagePack when msgspec is
+    installed and as JSON otherwise; the codec is stored in each file header.
+    Processed cast hashes and broadcast transaction hashes are not repeated
+    here, they already live in the dedup store and the job queue.
+    """
+
+    MAGIC = b"CIS1"
+    RECORD_HEADER = struct.Struct(">II")  # Payload length and CRC-32
+
+    def __init__(self, snapshot_path: str = STATE_SNAPSHOT_PATH, wal_path: str = STATE_WAL_PATH,
+                 snapshot_interval: float = STATE_SNAPSHOT_INTERVAL, wal_max_bytes: int = STATE_WAL_MAX_BYTES):
+        self.snapshot_path = snapshot_path
+        self.wal_path = wal_path
+        self.snapshot_interval = snapshot_interval
+        self.wal_max_bytes = wal_max_bytes
+        self.codec = b"M" if msgspec is not None else b"J"
+        self.channels: Dict[str, Dict] = {}  # channel_id -> cursor time "t", hash "h", interval "i", metadata "info"
+        self.pending: Dict[str, List] = {}  # cast hash -> [channel_id, cast fields]
+        for path in (snapshot_path, wal_path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._wal = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _encode(self, value: Any) -> bytes:
+        if self.codec == b"M":
+            return msgspec.msgpack.encode(value)
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    @staticmethod
+    def _decoder(codec: bytes) -> Callable[[bytes], Any]:
+        if codec == b"M":
+            if msgspec is None:
+                raise ValueError("state was written with msgspec, which is not installed")
+            return msgspec.msgpack.decode
+        return json.loads
+
+    def load(self):
+        """Restore the latest snapshot, replay the log on top of it, then compact both"""
+        started = time.perf_counter()
+        replayed = 0
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "rb") as f:
+                    header = f.read(len(self.MAGIC) + 1)
+                    if header[:len(self.MAGIC)] == self.MAGIC:
+                        state = self._decoder(header[-1:])(f.read())
+                        self.channels = state.get("channels", {})
+                        self.pending = state.get("pending", {})
+            if os.path.exists(self.wal_path):
+                with open(self.wal_path, "rb") as f:
+                    data = f.read()
+                if data[:len(self.MAGIC)] == self.MAGIC:
+                    decode = self._decoder(data[len(self.MAGIC):len(self.MAGIC) + 1])
+                    offset = len(self.MAGIC) + 1
+                    while offset + self.RECORD_HEADER.size <= len(data):
+                        length, checksum = self.RECORD_HEADER.unpack_from(data, offset)
+                        payload = data[offset + self.RECORD_HEADER.size:offset + self.RECORD_HEADER.size + length]
+                        if len(payload) < length or zlib.crc32(payload) != checksum:
+                            break  # Torn write at the end of the log from a crash
+                        self._apply(decode(payload))
+                        offset += self.RECORD_HEADER.size + length
+                        replayed += 1
+        except Exception as e:
+            logger.error(f"Could not restore state from {self.snapshot_path}, starting cold: {str(e)}")
+            self.channels, self.pending = {}, {}
+
+        # Start a fresh log so new records never follow a torn one
+        self.snapshot()
+        if self.channels or self.pending:
+            logger.info(f"Restored {len(self.channels)} channel cursor(s) and {len(self.pending)} in-flight cast(s) "
+                        f"({replayed} log records) in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def _apply(self, record: List):
+        kind = record[0]
+        if kind == "cursor":
+            _, channel_id, last_processed_time, last_cast_hash, interval = record
+            entry = self.channels.setdefault(channel_id, {})
+            entry.update(t=last_processed_time, h=last_cast_hash, i=interval)
+        elif kind == "info":
+            self.channels.setdefault(record[1], {})["info"] = record[2]
+        elif kind == "cast":
+            self.pending[record[1]] = record[2]
+        elif kind == "done":
+            self.pending.pop(record[1], None)
+
+    def _append(self, record: List):
+        self._apply(record)
+        if self._wal is None:
+            return
+        payload = self._encode(record)
+        self._wal.write(self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._wal.flush()  # In the OS page cache, so it survives the process crashing
+        if self._wal.tell() >= self.wal_max_bytes:
+            self.snapshot()
+
+    def record_cursor(self, channel: "ChannelState"):
+        self._append(["cursor", channel.channel_id, channel.last_processed_time, channel.last_cast_hash,
+                      channel.interval])
+
+    def record_channel_info(self, channel_id: str, channel_info: Dict):
+        self._append(["info", channel_id, channel_info])
+
+    def record_cast(self, cast: Cast, channel_id: str):
+        """Remember a discovered cast until record_done is called for it"""
+        if cast.hash not in self.pending:
+            self._append(["cast", cast.hash, [channel_id, *cast.to_record()]])
+
+    def record_done(self, cast_hash: str):
+        if cast_hash in self.pending:
+            self._append(["done", cast_hash])
+
+    def pending_casts(self) -> List[Tuple[Cast, str]]:
+        """Casts that were in the pipeline when the process stopped, oldest first"""
+        casts = [(Cast.from_record(record[1:]), record[0]) for record in self.pending.values()]
+        casts.sort(key=lambda item: item[0].timestamp)
+        return casts
+
+    def snapshot(self):
+        """Write the full state atomically and truncate the log"""
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.MAGIC + self.codec + self._encode({"channels": self.channels, "pending": self.pending}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        if self._wal is not None:
+            self._wal.close()
+        self._wal = open(self.wal_path, "wb")
+        self._wal.write(self.MAGIC + self.codec)
+        self._wal.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Error writing state snapshot: {str(e)}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._wal is not None:
+            self.snapshot()
+            self._wal.close()
+            self._wal = None
+
+
+# Coordination between worker processes that split the channels and wallets
+class LeaseStore:
+    """SQLite (WAL) file shared by workers for heartbeats, leases and channel cursors.
+
+    A lease is held by one worker until it expires; the holder renews it on
+    every heartbeat, so the leases of a worker that dies lapse after ttl
+    seconds and can be taken over. Cursors let the next owner of a channel
+    resume from where the previous one stopped.
+    """
+
+    def __init__(self, path: str = COORDINATION_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cursors ("
+            "channel_id TEXT PRIMARY KEY, last_processed_time REAL NOT NULL, last_cast_hash TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending_casts ("
+            "cast_hash TEXT PRIMARY KEY, channel_id TEXT NOT NULL, record TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def heartbeat(self, worker_id: str):
+        self._db.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat_at) VALUES (?, ?)",
+                         (worker_id, time.time()))
+        self._db.commit()
+
+    def live_workers(self, ttl: float) -> List[str]:
+        """Workers that sent a heartbeat within the last ttl seconds"""
+        rows = self._db.execute("SELECT worker_id FROM workers WHERE heartbeat_at >= ? ORDER BY worker_id",
+                                (time.time() - ttl,))
+        return [row[0] for row in rows]
+
+    def prune_workers(self, ttl: float):
+        """Forget workers that stopped sending heartbeats"""
+        self._db.execute("DELETE FROM workers WHERE heartbeat_at < ?", (time.time() - ttl,))
+        self._db.execute("DELETE FROM leases WHERE expires_at < ?", (time.time() - ttl,))
+        self._db.commit()
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease; fails while another worker holds it unexpired"""
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] != owner and row[1] >= now:
+                self._db.rollback()
+                return False
+            self._db.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                             (name, owner, now + ttl))
+            self._db.commit()
+            return True
+        except BaseException:
+            self._db.rollback()
+            raise
+
+    def release(self, name: str, owner: str):
+        self._db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        self._db.commit()
+
+    def leave(self, worker_id: str):
+        """Drop every lease and the heartbeat of a worker that is shutting down"""
+        self._db.execute("DELETE FROM leases WHERE owner = ?", (worker_id,))
+        self._db.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+        self._db.commit()
+
+    def save_cursor(self, channel_id: str, last_processed_time: float, last_cast_hash: Optional[str]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO cursors (channel_id, last_processed_time, last_cast_hash) VALUES (?, ?, ?)",
+            (channel_id, last_processed_time, last_cast_hash)
+        )
+        self._db.commit()
+
+    def load_cursor(self, channel_id: str) -> Optional[Tuple[float, Optional[str]]]:
+        row = self._db.execute("SELECT last_processed_time, last_cast_hash FROM cursors WHERE channel_id = ?",
+                               (channel_id,)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def save_pending(self, casts: List[Cast], channel_id: str):
+        """Record discovered casts until finish_pending, so a channel's next owner can resume them"""
+        self._db.executemany(
+            "INSERT OR IGNORE INTO pending_casts (cast_hash, channel_id, record) VALUES (?, ?, ?)",
+            [(cast.hash, channel_id, json.dumps(cast.to_record())) for cast in casts]
+        )
+        self._db.commit()
+
+    def finish_pending(self, cast_hash: str):
+        self._db.execute("DELETE FROM pending_casts WHERE cast_hash = ?", (cast_hash,))
+        self._db.commit()
+
+    def load_pending(self, channel_id: str) -> List[Cast]:
+        """Unfinished casts of a channel, oldest first"""
+        rows = self._db.execute("SELECT record FROM pending_casts WHERE channel_id = ?", (channel_id,))
+        casts = [Cast.from_record(json.loads(record)) for (record,) in rows]
+        casts.sort(key=lambda cast: cast.timestamp)
+        return casts
+
+    def close(self):
+        self._db.close()
+
+
+def rendezvous_owner(key: str, workers: List[str]) -> str:
+    """Worker with the highest hash for key, so a worker joining or leaving only moves its own share"""
+    return max(workers, key=lambda worker: hashlib.sha256(f"{worker}:{key}".encode()).digest())
+
+
+class PartitionCoordinator:
+    """Splits channels and signer wallets between worker processes.
+
+    Every interval the worker sends a heartbeat, works out which channels
+    and wallets are its share among the live workers by rendezvous hashing,
+    releases what is no longer its share and leases the rest. A channel is
+    only polled, and a wallet only signs, while this worker holds its lease,
+    so two workers never mint the same cast or reuse a nonce. Wallets are
+    kept until their in-flight deployments finish. The worker holding the
+    leader lease also requeues jobs abandoned by workers that died.
+    """
+
+    def __init__(self, store: LeaseStore, channel_ids: List[str],
+                 on_channel_acquired: Callable[[str], Awaitable[bool]], on_channel_released: Callable[[str], None],
+                 jobs: JobQueue, job_workers: JobWorkers, wallets: Optional[WalletPool] = None,
+                 worker_id: str = WORKER_ID, ttl: float = LEASE_TTL, interval: float = LEASE_RENEW_INTERVAL):
+        self.store = store
+        self.channel_ids = channel_ids
+        self.on_channel_acquired = on_channel_acquired
+        self.on_channel_released = on_channel_released
+        self.jobs = jobs
+        self.job_workers = job_workers
+        self.wallets = wallets
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self.interval = interval
+        self.channels: Set[str] = set()
+        self.is_leader = False
+        if wallets is not None:
+            wallets.owned = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Take the first share of partitions, then keep rebalancing in the background"""
+        logger.info(f"Worker {self.worker_id} joining partitioned deployment via {self.store.path}")
+        await self.rebalance()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Hand everything back right away instead of making the other workers wait for expiry
+        self.store.leave(self.worker_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.rebalance()
+            except Exception as e:
+                logger.error(f"Error rebalancing partitions: {str(e)}")
+
+    async def rebalance(self):
+        self.store.heartbeat(self.worker_id)
+        workers = self.store.live_workers(self.ttl)
+        if self.worker_id not in workers:
+            workers.append(self.worker_id)
+
+        # Renew job and wallet leases first so slow channel connects can never let them lapse
+        self.jobs.renew_leases()
+        if self.wallets is not None:
+            await self._rebalance_wallets(workers)
+        await self._rebalance_channels(workers)
+
+        was_leader = self.is_leader
+        self.is_leader = self.store.acquire("leader", self.worker_id, self.ttl)
+        if self.is_leader and not was_leader:
+            logger.info(f"Worker {self.worker_id} is now the leader of {len(workers)} worker(s)")
+        if self.is_leader:
+            self.jobs.recover_expired(live_workers=workers)
+            self.store.prune_workers(self.ttl)
+
+        PARTITIONS_OWNED.set(len(self.channels), kind="channel")
+        if self.wallets is not None:
+            PARTITIONS_OWNED.set(len(self.wallets.owned), kind="wallet")
+        IS_LEADER.set(1 if self.is_leader else 0)
+
+    async def _rebalance_channels(self, workers: List[str]):
+        desired = {c for c in self.channel_ids if rendezvous_owner(f"channel:{c}", workers) == self.worker_id}
+        for channel_id in self.channels - desired:
+            self.on_channel_released(channel_id)
+            self.store.release(f"channel:{channel_id}", self.worker_id)
+            self.channels.discard(channel_id)
+            logger.info(f"Handed channel /{channel_id} to another worker")
+
+        acquired = []
+        for channel_id in desired:
+            # Fails until the previous owner releases the channel or its lease expires
+            held = self.store.acquire(f"channel:{channel_id}", self.worker_id, self.ttl)
+            if held and channel_id not in self.channels:
+                acquired.append(channel_id)
+            elif not held and channel_id in self.channels:
+                logger.warning(f"Lost the lease on channel /{channel_id}; it is owned by another worker")
+                self.on_channel_released(channel_id)
+                self.channels.discard(channel_id)
+
+        await asyncio.gather(*(self._connect_channel(channel_id) for channel_id in acquired))
+
+    async def _connect_channel(self, channel_id: str):
+        """Start polling a newly leased channel, giving up until the next rebalance if it takes too long"""
+        try:
+            connected = await asyncio.wait_for(self.on_channel_acquired(channel_id), timeout=self.interval)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out connecting to channel /{channel_id}; retrying on the next rebalance")
+            connected = False
+        if connected:
+            self.channels.add(channel_id)
+        else:
+            self.store.release(f"channel:{channel_id}", self.worker_id)
+
+    async def _rebalance_wallets(self, workers: List[str]):
+        owned = self.wallets.owned
+        for shard in self.wallets.shards:
+            name = f"wallet:{shard.address}"
+            if rendezvous_owner(name, workers) != self.worker_id:
+                # A wallet with deployments in flight stays until they finish so its nonces never overlap
+                if shard.address in owned and shard.active == 0:
+                    owned.discard(shard.address)
+                    self.store.release(name, self.worker_id)
+                    logger.info(f"Handed wallet {shard.address} to another worker")
+                elif shard.address in owned:
+                    self.store.acquire(name, self.worker_id, self.ttl)
+                continue
+
+            held = self.store.acquire(name, self.worker_id, self.ttl)
+            if held and shard.address not in owned:
+                # The previous owner may have sent transactions; read the nonce from the chain again
+                await shard.deployer.nonces.resync()
+                owned.add(shard.address)
+                logger.info(f"Signing deployments with wallet {shard.address}")
+            elif not held and shard.address in owned:
+                logger.warning(f"Lost the lease on wallet {shard.address}; it is owned by another worker")
+                owned.discard(shard.address)
+
+        # Deploy jobs are left in the queue for workers that hold a wallet
+        if owned:
+            self.job_workers.skip_actions.discard("clanker_deploy")
+        else:
+            self.job_workers.skip_actions.add("clanker_deploy")
+
+
+class PipelineStage:
+    """One stage of a CastPipeline: an async handler and the number of workers running it"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+
+
+class CastPipeline:
+    """Staged worker pipeline connected by bounded asyncio queues.
+
+    Each stage handler receives an item and returns the item for the next
+    stage, or None to stop processing it. Queues are bounded, so submit()
+    waits when the first stage is saturated and submit_nowait() raises
+    asyncio.QueueFull.
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Create the stage queues and spawn the workers"""
+        if self._workers:
+            return
+        self.queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def submit(self, item: Any):
+        """Queue an item for the first stage, waiting while it is full"""
+        await self.queues[0].put(item)
+
+    def submit_nowait(self, item: Any):
+        """Queue an item for the first stage, raising asyncio.QueueFull if it is full"""
+        self.queues[0].put_nowait(item)
+
+    async def join(self):
+        """Wait until every submitted item has left the last stage"""
+        for stage_queue in self.queues:
+            await stage_queue.join()
+
+    def depths(self) -> Dict[str, int]:
+        """Number of items waiting in front of each stage"""
+        return {stage.name: stage_queue.qsize() for stage, stage_queue in zip(self.stages, self.queues)}
+
+    async def stop(self):
+        """Cancel the workers; items still queued are dropped"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        stage_queue = self.queues[index]
+        while True:
+            item = await stage_queue.get()
+            try:
+                result = await stage.handler(item)
+                if result is not None and index + 1 < len(self.stages):
+                    await self.queues[index + 1].put(result)
+            except Exception as e:
+                logger.error("Error in %s stage: %s", stage.name, e)
+            finally:
+                stage_queue.task_done()
+
+
+class CastJob:
+    """A discovered image cast moving through the processing pipeline"""
+
+    def __init__(self, cast: Cast, channel_id: str):
+        self.cast = cast
+        self.channel_id = channel_id
+        self.cast_id = cast.hash
+        self.author_name = cast.author_username
+        self.display_name = cast.author_display_name
+        text = cast.text.strip()
+        self.image_urls: List[str] = cast.image_urls
+        self.image_url: Optional[str] = None  # First image that passed verification
+        self.image_phash: Optional[int] = None  # Perceptual hash of image_url, when dedup is enabled
+        self.image_sha256: Optional[str] = None  # Digest of the local copy, when the image store is enabled
+
+        # Create title and description for the content
+        if text:
+            self.title = text[:50] + ("..." if len(text) > 50 else "")
+        else:
+            self.title = f"Photo by @{self.author_name} from Farcaster"
+
+        self.description = f"Posted by @{self.author_name} on Farcaster\n\n{text}"
+        self.token_name = f"{self.author_name[:8]}{str(int(time.time()))[-4:]}"
+        self.token_symbol = f"FC{str(int(time.time()))[-4:]}"
+
+
+class WebhookServer:
+    """Lightweight HTTP endpoint that accepts signed Neynar cast webhooks"""
+
+    SIGNATURE_HEADER = "X-Neynar-Signature"
+
+    def __init__(self, handler: Callable[[Dict], Awaitable[bool]], secret: Optional[str],
+                 host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT, path: str = WEBHOOK_PATH):
+        self.handler = handler
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+
+    @staticmethod
+    def sign(secret: str, body: bytes) -> str:
+        """HMAC-SHA512 signature Neynar sends for a webhook body"""
+        return hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Listening for Neynar webhooks on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+
+        if self.secret:
+            signature = request.headers.get(self.SIGNATURE_HEADER, "")
+            if not hmac.compare_digest(signature, self.sign(self.secret, body)):
+                logger.warning("Rejected webhook with invalid signature")
+                return web.json_response({"error": "invalid signature"}, status=401)
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+
+        if payload.get("type") != "cast.created" or not isinstance(payload.get("data"), dict):
+            return web.json_response({"accepted": False})
+
+        try:
+            accepted = await self.handler(payload["data"])
+        except asyncio.QueueFull:
+            # Neynar retries failed deliveries, and the reconciliation poll catches anything it gives up on
+            return web.json_response({"accepted": False}, status=503)
+        return web.json_response({"accepted": accepted})
+
+
+async def send_test_webhook(url: str, secret: str, channel_id: str, image_url: str,
+                            text: str = "Test cast from the stub sender") -> Dict:
+    """Post a signed cast.created webhook, shaped like Neynar's, to a running bot"""
+    cast = {
+        "hash": f"0x{secrets.token_hex(20)}",
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "text": text,
+        "author": {"username": "stub_sender", "display_name": "Stub Sender"},
+        "embeds": [{"url": image_url}],
+        "channel": {"id": channel_id},
+    }
+    body = json.dumps({"created_at": int(time.time()), "type": "cast.created", "data": cast}).encode()
+    headers = {
+        "Content-Type": "application/json",
+        WebhookServer.SIGNATURE_HEADER: WebhookServer.sign(secret, body),
+    }
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, data=body, headers=headers) as response:
+            result = {"status": response.status, "cast_hash": cast["hash"], "response": await response.text()}
+    logger.info(f"Stub webhook for cast {cast['hash']} returned {result['status']}: {result['response']}")
+    return result
+
+
+class CoinItBot:
+    """Bot that monitors Farcaster channels and posts images to Zora and deploys Clanker tokens"""
+    
+    def __init__(self, neynar_key: str, wallet_key: Union[str, List[str]], rpc_url: str,
+                 channel_ids: Union[str, List[str]]):
+        # Initialize API clients over one shared connection pool and rate governor
+        self.governor = RateGovernor(default_rate_limits(rpc_url))
+        self.http = AsyncHTTPClient(governor=self.governor)
+
+        # Initialize wallets; all clients share one batching RPC transport over the same pool
+        wallet_keys = [wallet_key] if isinstance(wallet_key, str) else list(wallet_key)
+        self.accounts = [privateKeyToAccount(key) for key in wallet_keys]
+        self.account = self.accounts[0]
+        if ENABLE_RPC_BATCHING:
+            self.rpc = BatchingRPCTransport(rpc_url, self.http)
+            transport = custom(self.rpc)
+        else:
+            self.rpc = None
+            transport = http(rpc_url)
+        self.public_client = createPublicClient(
+            chain=base,
+            transport=transport
+        )
+        self.wallet_client = createWalletClient(
+            account=self.account,
+            chain=base,
+            transport=transport
+        )
+        self.neynar = NeynarAPI(neynar_key, http_client=self.http)
+        
+        if ENABLE_ZORA:
+            self.zora = ZoraAPI(
+                api_key=ZORA_API_KEY,
+                wallet_client=self.wallet_client,
+                chain="base",
+                http_client=self.http
+            )
+        else:
+            self.zora = None
+            
+        if ENABLE_CLANKER:
+            self.gas_scheduler = GasScheduler(self.public_client) if DEPLOY_BASE_FEE_CAP_GWEI > 0 else None
+            log_watcher = FactoryLogWatcher(self.public_client, CLANKER_FACTORY_ADDRESS) if CONFIRM_VIA_LOGS else None
+
+            # One deployer per wallet, each with its own nonces, so deployments from different wallets never queue
+            shards = []
+            for account in self.accounts:
+                wallet_client = self.wallet_client if account is self.account else createWalletClient(
+                    account=account,
+                    chain=base,
+                    transport=transport
+                )
+                deployer = ClankerDeployer(
+                    wallet_client=wallet_client,
+                    public_client=self.public_client,
+                    factory_address=CLANKER_FACTORY_ADDRESS,
+                    nonce_manager=NonceManager(self.public_client, account.address),
+                    log_watcher=log_watcher,
+                    # The batching transport is governed already; a plain HTTP transport is not
+                    governor=None if self.rpc is not None else self.governor,
+                    rate_key=urlsplit(rpc_url).netloc
+                )
+                shards.append(WalletShard(account, wallet_client, deployer))
+            self.wallets = WalletPool(shards, self.public_client)
+        else:
+            self.gas_scheduler = None
+            self.wallets = None
+            
+        self.channel_ids = [channel_ids] if isinstance(channel_ids, str) else list(channel_ids)
+        if ENABLE_WEBHOOK:
+            # Casts arrive by webhook; polling only reconciles anything the webhooks missed
+            self.scheduler = ChannelScheduler(
+                self.check_for_new_images,
+                min_interval=WEBHOOK_RECONCILE_INTERVAL,
+                max_interval=WEBHOOK_RECONCILE_INTERVAL
+            )
+            self.webhook = WebhookServer(self.handle_webhook_cast, NEYNAR_WEBHOOK_SECRET)
+        else:
+            self.scheduler = ChannelScheduler(self.check_for_new_images)
+            self.webhook = None
+        self.processed_casts = create_dedup_store()  # Keep track of processed cast IDs across restarts
+        self.in_flight_casts: Set[str] = set()  # Casts queued in the pipeline but not finished yet
+        self.image_index = PerceptualHashIndex(shared=ENABLE_PARTITIONING) if ENABLE_IMAGE_DEDUP else None
+
+        # Zora mints and Clanker deployments run as durable jobs so failures are retried and survive restarts
+        self.jobs = JobQueue(owner=WORKER_ID if ENABLE_PARTITIONING else None)
+        self.job_workers = JobWorkers(self.jobs, {
+            "zora_mint": self.run_zora_job,
+            "clanker_deploy": self.run_clanker_job,
+        })
+        self.image_store = ImageStore(self.http) if ENABLE_IMAGE_STORE else None
+
+        # With several workers, each polls and signs only for the channels and wallets it has leased
+        self.leases = None
+        self.coordinator = None
+        if ENABLE_PARTITIONING:
+            self.leases = LeaseStore()
+            self.coordinator = PartitionCoordinator(
+                self.leases, self.channel_ids, self.acquire_channel, self.scheduler.remove_channel,
+                self.jobs, self.job_workers, self.wallets
+            )
+
+        # A single process checkpoints its cursors and in-flight casts; partitioned workers share cursors via leases
+        self.checkpoint = StateCheckpoint() if ENABLE_STATE_CHECKPOINT and not ENABLE_PARTITIONING else None
+        self._tasks: Set[asyncio.Task] = set()  # Background startup and resume work
+
+        # discover -> verify -> store -> dedup -> enqueue jobs
+        stages = [PipelineStage("verify", self.verify_cast, VERIFY_WORKERS)]
+        if self.image_store is not None:
+            stages.append(PipelineStage("store", self.store_image, VERIFY_WORKERS))
+        if self.image_index is not None:
+            stages.append(PipelineStage("dedup", self.dedup_image, VERIFY_WORKERS))
+        stages.append(PipelineStage("publish", self.publish_cast, 1))
+        self.pipeline = CastPipeline(stages)
+
+        self.ready = False
+        self.metrics = MetricsServer(lambda: self.ready) if ENABLE_METRICS else None
+        METRICS.collectors.append(self.collect_metrics)
+        
+    async def start(self):
+        """Start the bot's main loop"""
+        logger.info(f"Starting Social Bridge Bot to monitor {len(self.channel_ids)} channel(s)")
+        logger.info(f"Features enabled: Zora: {ENABLE_ZORA}, Clanker: {ENABLE_CLANKER} ({len(self.accounts)} wallet(s))")
+        if self.metrics is not None:
+            await self.metrics.start()
+        
+        if self.coordinator is not None:
+            # Other workers may already own some or all channels, so starting with none is fine
+            await self.coordinator.start()
+        else:
+            # Channels known from the last run resume polling at once from their checkpointed cursor
+            restored = []
+            if self.checkpoint is not None:
+                self.checkpoint.load()
+                restored = [channel_id for channel_id in self.channel_ids if self.restore_channel(channel_id)]
+
+            # Get channel info to confirm each channel exists
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_POLLS)
+
+            async def connect(channel_id: str):
+                async with semaphore:
+                    await self.connect_channel(channel_id)
+
+            async def connect_all():
+                await asyncio.gather(*(connect(channel_id) for channel_id in self.channel_ids))
+
+            if restored:
+                # Refresh the cached metadata and connect any new channels without holding up polling
+                self.spawn(connect_all())
+            else:
+                await connect_all()
+
+            if not self.scheduler.channels:
+                logger.error("Please check your channel IDs and API key.")
+                return
+        
+        # Start processing workers, the webhook endpoint and the monitoring loop
+        if self.wallets is not None:
+            self.wallets.start()
+        self.job_workers.start()
+        self.pipeline.start()
+        if self.checkpoint is not None:
+            self.checkpoint.start()
+            self.spawn(self.resume_casts())
+        if self.image_store is not None:
+            await self.image_store.start()
+        if self.webhook is not None:
+            await self.webhook.start()
+        self.ready = True
+        await self.scheduler.run()
+
+    async def connect_channel(self, channel_id: str) -> Optional[ChannelState]:
+        """Confirm a channel exists and start polling it"""
+        try:
+            channel_info = await self.neynar.get_channel_info_async(channel_id)
+        except Exception as e:
+            logger.error(f"Failed to get channel info for {channel_id}: {str(e)}")
+            return None
+        state = self.scheduler.add_channel(channel_id)
+        state.channel_info = channel_info
+        if self.checkpoint is not None:
+            self.checkpoint.record_channel_info(channel_id, channel_info)
+        logger.info(f"Connected to channel: {channel_info.get('channel', {}).get('name', 'unknown')} ({channel_id})")
+        return state
+
+    def restore_channel(self, channel_id: str) -> bool:
+        """Start polling a channel from its checkpointed metadata and cursor, without any API calls"""
+        entry = self.checkpoint.channels.get(channel_id)
+        if not entry or "info" not in entry:
+            return False
+        state = self.scheduler.add_channel(channel_id, interval=entry.get("i", POLLING_INTERVAL))
+        state.channel_info = entry["info"]
+        if "t" in entry:
+            state.last_processed_time = entry["t"]
+            state.last_cast_hash = entry["h"]
+        return True
+
+    def spawn(self, coroutine: Awaitable):
+        """Run background work that is cancelled when the bot closes"""
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def resume_casts(self):
+        """Put casts that were still in the pipeline when the bot stopped back into it"""
+        for cast, channel_id in self.checkpoint.pending_casts():
+            await self.submit_cast(cast, channel_id)
+
+    async def resume_channel_casts(self, channel_id: str):
+        """Process casts a channel's previous owner discovered but did not finish.
+
+        The previous owner may still be finishing some of them after a
+        rebalance; the job idempotency keys keep those from being minted twice.
+        """
+        for cast in self.leases.load_pending(channel_id):
+            await self.submit_cast(cast, channel_id)
+
+    async def acquire_channel(self, channel_id: str) -> bool:
+        """Start polling a channel leased by this worker from the cursor its previous owner left"""
+        state = await self.connect_channel(channel_id)
+        if state is None:
+            return False
+        cursor = self.leases.load_cursor(channel_id)
+        if cursor is not None:
+            state.last_processed_time, state.last_cast_hash = cursor
+        self.spawn(self.resume_channel_casts(channel_id))
+        return True
+
+    async def close(self):
+        """Stop pipeline workers and release pooled HTTP connections and persistent stores"""
+        self.ready = False
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.webhook is not None:
+            await self.webhook.stop()
+        if self.image_store is not None:
+            await self.image_store.stop()
+        if self.metrics is not None:
+            await self.metrics.stop()
+        await self.pipeline.stop()
+        await self.job_workers.stop()
+        if self.checkpoint is not None:
+            await self.checkpoint.close()  # Casts dropped from the pipeline stay recorded and resume next start
+        if self.wallets is not None:
+            await self.wallets.stop()
+        if self.coordinator is not None:
+            await self.coordinator.stop()
+            self.leases.close()
+        await self.http.close()
+        self.processed_casts.close()
+        self.jobs.close()
+        if self.image_index is not None:
+            self.image_index.close()
+        if self.image_store is not None:
+            self.image_store.close()
+
+    def collect_metrics(self):
+        """Refresh queue-depth gauges when metrics are scraped"""
+        for stage, depth in self.pipeline.depths().items():
+            QUEUE_DEPTH.set(depth, stage=stage)
+        for state, count in self.jobs.counts().items():
+            JOBS_BY_STATE.set(count, state=state)
+    
+    async def check_for_new_images(self, channel: ChannelState) -> int:
+        """Check for new images in the channel and process them"""
+        logger.debug("Checking for new images in channel /%s", channel.channel_id)
+        
+        # Get every cast since the channel's high-water mark
+        casts = await self.neynar.get_casts_since_async(
+            channel.channel_id,
+            since_timestamp=channel.last_processed_time,
+            since_hash=channel.last_cast_hash
+        )
+        CASTS_SEEN.inc(len(casts), channel=channel.channel_id)
+
+        # Casts come back newest first; process them in posting order
+        new_image_casts = self.neynar.filter_new_image_casts(list(reversed(casts)))
+
+        if casts:
+            # Persist the casts before the cursor moves past them, so a stop while they wait can't skip them
+            self.remember_casts(new_image_casts, channel.channel_id)
+            channel.last_cast_hash = casts[0].hash
+            channel.last_processed_time = max(channel.last_processed_time, casts[0].timestamp)
+            if self.checkpoint is not None:
+                self.checkpoint.record_cursor(channel)
+            if self.leases is not None:
+                # Shared so the channel's next owner resumes here after a rebalance
+                self.leases.save_cursor(channel.channel_id, channel.last_processed_time, channel.last_cast_hash)
+        
+        if not new_image_casts:
+            logger.debug("No new image casts found in /%s", channel.channel_id)
+            return 0
+        
+        logger.info("Found %d new image casts to process in /%s", len(new_image_casts), channel.channel_id,
+                    extra={"channel": channel.channel_id})
+        IMAGE_CASTS_SEEN.inc(len(new_image_casts), channel=channel.channel_id)
+        
+        # Hand each new cast to the pipeline; this waits while the pipeline is saturated
+        for cast in new_image_casts:
+            await self.submit_cast(cast, channel.channel_id)
+
+        return len(new_image_casts)
+
+    async def submit_cast(self, cast: Cast, channel_id: str, wait: bool = True) -> bool:
+        """Queue a cast for processing unless it was already processed or is in flight.
+
+        With wait=False the pipeline is not waited on: asyncio.QueueFull is
+        raised when it is full, before the cast is recorded anywhere.
+        """
+        cast_id = cast.hash
+        if cast_id in self.in_flight_casts:
+            DEDUP_LOOKUPS.inc(store="casts", result="hit")
+            return False
+        if cast_id in self.processed_casts:
+            DEDUP_LOOKUPS.inc(store="casts", result="hit")
+            self.forget_cast(cast_id)  # Finished before it was resumed
+            return False
+        DEDUP_LOOKUPS.inc(store="casts", result="miss")
+
+        job = CastJob(cast, channel_id)
+        if not wait:
+            self.pipeline.submit_nowait(job)
+        self.in_flight_casts.add(cast_id)
+        self.remember_casts([cast], channel_id)
+        if wait:
+            await self.pipeline.submit(job)
+        return True
+
+    def remember_casts(self, casts: List[Cast], channel_id: str):
+        """Persist discovered casts as unfinished so they are resumed after a restart or rebalance"""
+        if not casts:
+            return
+        if self.checkpoint is not None:
+            for cast in casts:
+                self.checkpoint.record_cast(cast, channel_id)
+        if self.leases is not None:
+            self.leases.save_pending(casts, channel_id)
+
+    def forget_cast(self, cast_id: str):
+        if self.checkpoint is not None:
+            self.checkpoint.record_done(cast_id)
+        if self.leases is not None:
+            self.leases.finish_pending(cast_id)
+
+    async def handle_webhook_cast(self, data: Dict) -> bool:
+        """Feed a cast delivered by webhook into the same pipeline as polled casts"""
+        channel_id = (data.get("channel") or {}).get("id")
+        if channel_id not in self.scheduler.channels:
+            return False
+
+        image_casts = self.neynar.filter_new_image_casts([Cast.from_dict(data)])
+        if not image_casts:
+            return False
+
+        logger.info("Received cast %s in /%s via webhook", image_casts[0].hash, channel_id,
+                    extra={"cast": image_casts[0].hash, "channel": channel_id})
+        # The webhook is answered right away; a full pipeline is reported to the sender instead of waited on
+        return await self.submit_cast(image_casts[0], channel_id, wait=False)
+
+    def finish_cast(self, job: CastJob):
+        """Record a cast as processed and release it from the in-flight set"""
+        self.processed_casts.add(job.cast_id)
+        self.in_flight_casts.discard(job.cast_id)
+        self.forget_cast(job.cast_id)
+        CASTS_PROCESSED.inc()
+
+    async def verify_cast(self, job: CastJob) -> Optional[CastJob]:
+        """Verify stage: check all image URLs of a cast concurrently and keep the first valid one"""
+        logger.info("Processing cast %s from @%s", job.cast_id, job.author_name,
+                    extra={"cast": job.cast_id, "channel": job.channel_id})
+
+        if not job.image_urls:
+            logger.warning("No images found in cast %s despite filters", job.cast_id)
+            self.finish_cast(job)
+            return None
+
+        try:
+            results = await asyncio.gather(*(self.neynar.verify_image_url_async(url) for url in job.image_urls))
+        except Exception:
+            self.in_flight_casts.discard(job.cast_id)
+            raise
+
+        for image_url, valid in zip(job.image_urls, results):
+            if valid:
+                # Only process the first valid image to avoid spam
+                job.image_url = image_url
+                return job
+            logger.warning("Skipping invalid image URL: %s", image_url, extra={"cast": job.cast_id})
+
+        self.finish_cast(job)
+        return None
+
+    async def store_image(self, job: CastJob) -> CastJob:
+        """Store stage: stream the image into the local content-addressed store"""
+        try:
+            job.image_sha256 = await self.image_store.fetch(job.image_url)
+        except Exception as e:
+            # Fail open: the mint can still use the original URL
+            logger.warning("Could not store image %s, using the original URL: %s", job.image_url, e)
+        return job
+
+    async def dedup_image(self, job: CastJob) -> Optional[CastJob]:
+        """Dedup stage: drop casts whose image is a near-duplicate of one already published"""
+        try:
+            if job.image_sha256 is not None:
+                data = self.image_store.path(job.image_sha256)  # Hashed from the local copy, no second download
+            else:
+                with CALL_LATENCY.time(call="image_download"):
+                    data = await self.http.download(job.image_url)
+            job.image_phash = await asyncio.get_running_loop().run_in_executor(None, compute_phash, data)
+        except Exception as e:
+            # Fail open: a hashing problem should not stop the image from being published
+            logger.warning("Could not hash image %s, skipping duplicate check: %s", job.image_url, e)
+            return job
+
+        match = self.image_index.find(job.image_phash, exclude_cast=job.cast_id)
+        DEDUP_LOOKUPS.inc(store="image_phash", result="miss" if match is None else "hit")
+        if match is not None:
+            _, original_cast, distance = match
+            logger.info("Skipping cast %s: image duplicates cast %s (distance %d)", job.cast_id, original_cast, distance,
+                        extra={"cast": job.cast_id})
+            self.finish_cast(job)
+            return None
+
+        # Index before publishing so duplicates later in the same burst are caught too
+        self.image_index.add(job.image_phash, job.cast_id, job.image_url)
+        return job
+
+    async def publish_cast(self, job: CastJob):
+        """Publish stage: queue a Zora mint and a Clanker deployment job for the image.
+
+        The jobs run in parallel on the job workers. Once queued they are
+        durable, so the cast counts as processed. If queueing fails the cast
+        stays pending and is resubmitted after a restart or by the channel's
+        next owner.
+        """
+        image_key = hashlib.sha256(job.image_url.encode()).hexdigest()[:16]
+        # Tokens always reference the original URL; the local copy may be evicted or offline
+        image_url = job.image_url
+        try:
+            # Upload to Zora if enabled
+            if ENABLE_ZORA and self.zora:
+                self.jobs.enqueue("zora_mint", f"zora_mint:{job.cast_id}:{image_key}", {
+                    "image_url": image_url,
+                    "title": job.title,
+                    "description": job.description,
+                    "author_name": job.author_name,
+                    "cast_id": job.cast_id,
+                    "channel_id": job.channel_id,
+                })
+
+            # Deploy Clanker token if enabled
+            if ENABLE_CLANKER and self.wallets:
+                self.jobs.enqueue("clanker_deploy", f"clanker_deploy:{job.cast_id}:{image_key}", {
+                    "image_url": image_url,
+                    "name": job.token_name,
+                    "symbol": job.token_symbol,
+                    "description": job.description,
+                    "shard_key": self.shard_key(job),
+                })
+            self.job_workers.notify()
+        except Exception:
+            self.in_flight_casts.discard(job.cast_id)
+            raise  # Logged by the pipeline worker
+        self.finish_cast(job)
+
+    def shard_key(self, job: CastJob) -> str:
+        """Key that picks the wallet for a cast's deployment, per WALLET_SHARD_BY"""
+        if WALLET_SHARD_BY == "channel":
+            return job.channel_id
+        if WALLET_SHARD_BY == "cast":
+            return job.cast_id
+        return job.author_name
+
+    async def run_zora_job(self, job: QueuedJob) -> Dict:
+        payload = job.payload
+        if job.sent_at is not None:
+            # An earlier attempt may have created the mint; the same idempotency key lets Zora return it instead
+            logger.warning("Resending Zora mint %s, first sent at %.0f", job.idempotency_key, job.sent_at)
+        self.jobs.mark_sent(job)
+        return await self.publish_to_zora(
+            payload["image_url"], payload["title"], payload["description"],
+            payload["author_name"], payload["cast_id"], payload["channel_id"],
+            idempotency_key=job.idempotency_key
+        )
+
+    async def run_clanker_job(self, job: QueuedJob) -> str:
+        payload = job.payload
+        if job.tx_hashes:
+            # Already broadcast before a restart or failure: wait for it rather than spending gas again
+            logger.info("Resuming Clanker deployment %s from %s transaction(s)", job.idempotency_key, len(job.tx_hashes))
+            # Confirmation only reads receipts, so any wallet's deployer can do it
+            try:
+                return await self.wallets.shards[0].deployer.confirm_deployment(job.tx_hashes)
+            except TransactionReverted as e:
+                raise FailJob(str(e)) from e
+
+        shard = self.wallets.assign(payload.get("shard_key", job.idempotency_key))
+        if shard is None:
+            raise DeferJob(self.wallets.check_interval, "no funded wallet available")
+
+        # Counted so a partitioned worker keeps the wallet lease until this deployment is done
+        shard.active += 1
+        try:
+            # Hold the deployment while gas is above the cap; the job comes back after the next fee check
+            if self.gas_scheduler is not None and not await self.gas_scheduler.admit(time.time() - job.created_at):
+                raise DeferJob(self.gas_scheduler.poll_interval, "base fee above cap")
+
+            return await self.deploy_clanker_token(
+                payload["image_url"], payload["name"], payload["symbol"], payload["description"],
+                on_submitted=lambda tx_hash: self.jobs.mark_submitted(job, tx_hash),
+                deployer=shard.deployer
+            )
+        except TransactionReverted as e:
+            # The nonce is spent on the reverted transaction; another attempt would only revert again
+            raise FailJob(str(e)) from e
+        finally:
+            shard.active -= 1
+    
+    async def publish_to_zora(self, image_url: str, title: str, description: str, author_name: str, cast_id: str,
+                              channel_id: str, idempotency_key: Optional[str] = None):
         """Publish an image to Zora"""
-        logger.info(f"Publishing image to Zora: {image_url}")
+        logger.info("Publishing image to Zora: %s", image_url, extra={"cast": cast_id, "channel": channel_id})
         
         # Prepare metadata for Zora
         metadata = {
@@ -547,7 +4403,7 @@ class CoinItBot:
             "creator": f"@{author_name}",
             "attributes": [
                 {"trait_type": "Source", "value": "Farcaster"},
-                {"trait_type": "Channel", "value": f"/{self.channel_id}"},
+                {"trait_type": "Channel", "value": f"/{channel_id}"},
                 {"trait_type": "Author", "value": f"@{author_name}"}
             ]
         }
@@ -557,34 +4413,41 @@ class CoinItBot:
         
         # Create mint on Zora
         try:
-            mint_result = self.zora.create_zora_mint(
+            mint_result = await self.zora.create_zora_mint_async(
                 name=title,
                 image_uri=image_url,  # Use the image URL directly
                 description=description,
-                creator=author_name
+                creator=author_name,
+                idempotency_key=idempotency_key
             )
             
-            logger.info(f"Successfully published to Zora: {mint_result.get('transaction_hash', 'unknown')}")
+            logger.info("Successfully published to Zora: %s", mint_result.get('transaction_hash', 'unknown'),
+                        extra={"cast": cast_id, "channel": channel_id})
+            return mint_result
         except Exception as e:
-            logger.error(f"Failed to publish to Zora: {str(e)}")
+            logger.error("Failed to publish to Zora: %s", e, extra={"cast": cast_id, "channel": channel_id})
             raise
     
-    async def deploy_clanker_token(self, image_url: str, name: str, symbol: str, description: str):
-        """Deploy a token using Clanker SDK"""
-        logger.info(f"Deploying token via Clanker: {name} ({symbol})")
+    async def deploy_clanker_token(self, image_url: str, name: str, symbol: str, description: str,
+                                   on_submitted: Optional[Callable[[str], None]] = None,
+                                   deployer: Optional[ClankerDeployer] = None):
+        """Deploy a token using Clanker SDK, from the given wallet's deployer or the first one"""
+        deployer = deployer or self.wallets.shards[0].deployer
+        logger.info("Deploying token via Clanker: %s (%s) from %s", name, symbol, deployer.wallet_client.account.address)
         
         try:
-            token_address = await self.clanker.deploy_token(
+            token_address = await deployer.deploy_token(
                 name=name,
                 symbol=symbol,
                 image_url=image_url,
-                description=description
+                description=description,
+                on_submitted=on_submitted
             )
             
-            logger.info(f"Successfully deployed token: {token_address}")
+            logger.info("Successfully deployed token: %s", token_address)
             return token_address
         except Exception as e:
-            logger.error(f"Failed to deploy token: {str(e)}")
+            logger.error("Failed to deploy token: %s", e)
             raise
 
 
@@ -600,16 +4463,20 @@ async def main():
         logger.error("ZORA_API_KEY environment variable is required when ENABLE_ZORA is true")
         return
     
-    if not WALLET_PRIVATE_KEY:
-        logger.error("WALLET_PRIVATE_KEY environment variable is required")
+    if not WALLET_PRIVATE_KEYS:
+        logger.error("WALLET_PRIVATE_KEY or WALLET_PRIVATE_KEYS environment variable is required")
+        return
+
+    if ENABLE_WEBHOOK and not NEYNAR_WEBHOOK_SECRET:
+        logger.error("NEYNAR_WEBHOOK_SECRET environment variable is required when ENABLE_WEBHOOK is true")
         return
     
     # Create and start the bot
     bot = CoinItBot(
         neynar_key=NEYNAR_API_KEY,
-        wallet_key=WALLET_PRIVATE_KEY,
+        wallet_key=WALLET_PRIVATE_KEYS,
         rpc_url=RPC_URL,
-        channel_id=PLANTS_CHANNEL_ID
+        channel_ids=CHANNEL_IDS
     )
     
     try:
@@ -618,7 +4485,80 @@ async def main():
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.error(f"Bot stopped due to error: {str(e)}")
+    finally:
+        await bot.close()
+
+
+def run_workers(count: int, restart_delay: float = 5.0):
+    """Run count partitioned bot processes on this host and restart any that exit.
+
+    Each child gets its own WORKER_ID, log file and metrics, webhook and
+    image ports (offset by its index) and shares channels, wallets and jobs with the others through
+    the SQLite files in STATE_DIR.
+    """
+    hostname = socket.gethostname()
+    children: Dict[int, subprocess.Popen] = {}
+    started_at: Dict[int, float] = {}
+    stopping = False
+
+    log_root, log_ext = os.path.splitext(LOG_FILE)
+
+    def spawn(index: int):
+        env = dict(
+            os.environ,
+            ENABLE_PARTITIONING="true",
+            WORKER_ID=f"{hostname}-{index}",
+            METRICS_PORT=str(METRICS_PORT + index),
+            WEBHOOK_PORT=str(WEBHOOK_PORT + index),
+            IMAGE_STORE_PORT=str(IMAGE_STORE_PORT + index),
+            # Separate files, since size-based rotation can't be shared between processes
+            LOG_FILE=f"{log_root}-{index}{log_ext}" if LOG_FILE else "",
+        )
+        children[index] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        started_at[index] = time.time()
+        logger.info(f"Started worker {hostname}-{index} (pid {children[index].pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(count):
+        spawn(index)
+
+    while not stopping:
+        time.sleep(1)
+        for index, child in list(children.items()):
+            # Wait a little before restarting so a worker that fails at startup doesn't spin
+            if child.poll() is not None and time.time() - started_at[index] >= restart_delay:
+                logger.warning(f"Worker {hostname}-{index} exited with code {child.returncode}, restarting")
+                spawn(index)
+
+    for child in children.values():
+        if child.poll() is None:
+            child.terminate()
+    for child in children.values():
+        try:
+            child.wait(timeout=LEASE_TTL)
+        except subprocess.TimeoutExpired:
+            child.kill()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Coin-It Social Bridge Bot")
+    parser.add_argument("--send-test-webhook", metavar="IMAGE_URL",
+                        help="Post a signed stub cast webhook with this image to a running bot and exit")
+    parser.add_argument("--webhook-url", default=f"http://localhost:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--channel", default=CHANNEL_IDS[0] if CHANNEL_IDS else PLANTS_CHANNEL_ID)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Run this many partitioned worker processes that split the channels and wallets")
+    args = parser.parse_args()
+
+    if args.send_test_webhook:
+        asyncio.run(send_test_webhook(args.webhook_url, NEYNAR_WEBHOOK_SECRET or "", args.channel,
+                                      args.send_test_webhook))
+    elif args.workers > 1:
+        run_workers(args.workers)
+    else:
+        asyncio.run(main())
\ No newline at end of file
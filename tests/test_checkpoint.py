@@ -0,0 +1,72 @@
+import os
+
+from coin_it_bot import Cast, PerceptualHashIndex, StateCheckpoint
+
+
+def make_cast(hash: str, timestamp: float) -> Cast:
+    cast = Cast(hash, timestamp, text="A plant", author_username="alice",
+                embeds=[("https://example.com/plant.jpg", "image/jpeg")])
+    cast.image_urls = ["https://example.com/plant.jpg"]
+    return cast
+
+
+def open_checkpoint(tmp_path) -> StateCheckpoint:
+    checkpoint = StateCheckpoint(str(tmp_path / "state.snapshot"), str(tmp_path / "state.wal"))
+    checkpoint.load()
+    return checkpoint
+
+
+def test_pending_casts_round_trip(tmp_path):
+    checkpoint = open_checkpoint(tmp_path)
+    checkpoint.record_cast(make_cast("0xb", 200.0), "plants")
+    checkpoint.record_cast(make_cast("0xa", 100.0), "plants")
+    checkpoint.record_cast(make_cast("0xc", 300.0), "cats")
+    checkpoint.record_done("0xc")
+
+    restored = open_checkpoint(tmp_path)
+    pending = restored.pending_casts()
+
+    assert [(cast.hash, channel_id) for cast, channel_id in pending] == [("0xa", "plants"), ("0xb", "plants")]
+    cast = pending[0][0]
+    assert cast.timestamp == 100.0
+    assert cast.text == "A plant"
+    assert cast.author_username == "alice"
+    assert cast.embeds == [("https://example.com/plant.jpg", "image/jpeg")]
+    assert cast.image_urls == ["https://example.com/plant.jpg"]
+
+
+def test_wal_replay_stops_at_torn_tail(tmp_path):
+    checkpoint = open_checkpoint(tmp_path)
+    checkpoint.record_cast(make_cast("0xa", 100.0), "plants")
+    checkpoint.record_cast(make_cast("0xb", 200.0), "plants")
+
+    # Simulate a crash in the middle of writing the last record
+    wal_path = checkpoint.wal_path
+    os.truncate(wal_path, os.path.getsize(wal_path) - 3)
+
+    restored = open_checkpoint(tmp_path)
+    assert [cast.hash for cast, _ in restored.pending_casts()] == ["0xa"]
+
+    # The torn record was compacted away, so new records replay after a restart
+    restored.record_cast(make_cast("0xc", 300.0), "plants")
+    assert [cast.hash for cast, _ in open_checkpoint(tmp_path).pending_casts()] == ["0xa", "0xc"]
+
+
+def test_wal_replay_ignores_corrupt_record(tmp_path):
+    checkpoint = open_checkpoint(tmp_path)
+    checkpoint.record_cast(make_cast("0xa", 100.0), "plants")
+    with open(checkpoint.wal_path, "ab") as f:
+        f.write(checkpoint.RECORD_HEADER.pack(4, 0) + b"junk")
+
+    assert [cast.hash for cast, _ in open_checkpoint(tmp_path).pending_casts()] == ["0xa"]
+
+
+def test_hash_index_skips_images_of_the_same_cast(tmp_path):
+    index = PerceptualHashIndex(str(tmp_path / "hashes.db"), threshold=4)
+    index.add(0xF0F0F0F0F0F0F0F0, "0xa", "https://example.com/plant.jpg")
+
+    # A cast resumed after a restart must not be a duplicate of its own image
+    assert index.find(0xF0F0F0F0F0F0F0F1, exclude_cast="0xa") is None
+    assert index.find(0xF0F0F0F0F0F0F0F1, exclude_cast="0xb") == (0xF0F0F0F0F0F0F0F0, "0xa", 1)
+    assert index.find(0x0F0F0F0F0F0F0F0F) is None
+    index.close()
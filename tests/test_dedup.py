@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import textwrap
+
+from coin_it_bot import PerceptualHashIndex, SQLiteDedupStore
+
+
+def run_other_worker(code: str):
+    """Run code in a separate process, as another partitioned worker would"""
+    subprocess.run([sys.executable, "-c", "import coin_it_bot\n" + textwrap.dedent(code)], check=True)
+
+
+def test_processed_casts_from_another_process_are_seen(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    store = SQLiteDedupStore(path, use_bloom=False)
+    store.add("0xa")
+    assert "0xb" not in store
+
+    run_other_worker(f"""
+        store = coin_it_bot.SQLiteDedupStore({path!r}, use_bloom=False)
+        assert "0xa" in store
+        store.add("0xb")
+        store.close()
+    """)
+
+    assert "0xb" in store
+    store.close()
+
+
+def test_shared_hash_index_sees_another_process(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    index = PerceptualHashIndex(path, threshold=4, shared=True)
+    index.add(0x00FF00FF00FF00FF, "0xa", "https://example.com/a.jpg")
+    assert index.find(0xF0F0F0F0F0F0F0F1) is None
+
+    run_other_worker(f"""
+        index = coin_it_bot.PerceptualHashIndex({path!r}, threshold=4, shared=True)
+        assert index.find(0x00FF00FF00FF00FE) is not None
+        index.add(0xF0F0F0F0F0F0F0F0, "0xb", "https://example.com/b.jpg")
+        index.close()
+    """)
+
+    assert index.find(0xF0F0F0F0F0F0F0F1) == (0xF0F0F0F0F0F0F0F0, "0xb", 1)
+    index.close()
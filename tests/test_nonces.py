@@ -0,0 +1,46 @@
+import asyncio
+
+from coin_it_bot import NonceManager
+
+
+class FakeChain:
+    def __init__(self, pending: int):
+        self.pending = pending
+        self.reads = 0
+
+    async def get_transaction_count(self, address, block_tag):
+        self.reads += 1
+        return self.pending
+
+
+def test_failed_nonce_is_reused_while_others_are_in_flight():
+    async def run():
+        chain = FakeChain(pending=7)
+        nonces = NonceManager(chain, "0xabc")
+        first, second, third = [await nonces.next_nonce() for _ in range(3)]
+        assert (first, second, third) == (7, 8, 9)
+
+        await nonces.release(second)
+        assert await nonces.next_nonce() == 8
+        assert await nonces.next_nonce() == 10
+        assert chain.reads == 1
+
+    asyncio.run(run())
+
+
+def test_counter_is_read_again_once_nothing_is_in_flight():
+    async def run():
+        chain = FakeChain(pending=3)
+        nonces = NonceManager(chain, "0xabc")
+        first = await nonces.next_nonce()
+        second = await nonces.next_nonce()
+        await nonces.finish(first)
+        await nonces.resync()  # Ignored, the second nonce is still in flight
+        assert chain.reads == 1
+
+        chain.pending = 5  # The failed transaction was broadcast after all
+        await nonces.release(second)
+        assert await nonces.next_nonce() == 5
+        assert chain.reads == 2
+
+    asyncio.run(run())
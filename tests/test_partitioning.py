@@ -0,0 +1,132 @@
+import asyncio
+import sqlite3
+import time
+
+from coin_it_bot import Cast, JobQueue, JobWorkers, LeaseStore, rendezvous_owner
+
+
+def test_lease_is_exclusive_until_released(tmp_path):
+    store = LeaseStore(str(tmp_path / "coordination.db"))
+    assert store.acquire("channel:plants", "worker-0", ttl=60)
+    assert store.acquire("channel:plants", "worker-0", ttl=60)  # Renewal by the holder
+    assert not store.acquire("channel:plants", "worker-1", ttl=60)
+
+    store.release("channel:plants", "worker-1")  # Only the holder can release
+    assert not store.acquire("channel:plants", "worker-1", ttl=60)
+
+    store.release("channel:plants", "worker-0")
+    assert store.acquire("channel:plants", "worker-1", ttl=60)
+    store.close()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    store = LeaseStore(str(tmp_path / "coordination.db"))
+    assert store.acquire("wallet:0xabc", "worker-0", ttl=-1)
+    assert store.acquire("wallet:0xabc", "worker-1", ttl=60)
+    assert not store.acquire("wallet:0xabc", "worker-0", ttl=60)
+    store.close()
+
+
+def test_pending_casts_are_shared_by_channel(tmp_path):
+    path = str(tmp_path / "coordination.db")
+    store = LeaseStore(path)
+    newer = Cast("0xb", 200.0, text="Newer", author_username="bob", embeds=[("https://example.com/b.png", "")])
+    newer.image_urls = ["https://example.com/b.png"]
+    older = Cast("0xa", 100.0, text="Older", author_username="alice")
+    store.save_pending([newer, older], "plants")
+    store.save_pending([Cast("0xc", 50.0)], "cats")
+    store.finish_pending("0xc")
+
+    # The next owner of the channel reads them from its own connection
+    other = LeaseStore(path)
+    pending = other.load_pending("plants")
+    assert [cast.hash for cast in pending] == ["0xa", "0xb"]
+    assert pending[1].embeds == [("https://example.com/b.png", "")]
+    assert pending[1].image_urls == ["https://example.com/b.png"]
+    assert other.load_pending("cats") == []
+    store.close()
+    other.close()
+
+
+def test_rendezvous_owner_only_moves_the_leaving_workers_share():
+    workers = ["worker-0", "worker-1", "worker-2"]
+    keys = [f"channel-{i}" for i in range(50)]
+    before = {key: rendezvous_owner(key, workers) for key in keys}
+    after = {key: rendezvous_owner(key, workers[:2]) for key in keys}
+    assert {key for key in keys if before[key] != after[key]} == {key for key in keys if before[key] == "worker-2"}
+
+
+def test_claim_skips_actions(tmp_path):
+    jobs = JobQueue(str(tmp_path / "jobs.db"), owner="worker-0")
+    jobs.enqueue("clanker", "clanker:0xa", {"name": "a"})
+    jobs.enqueue("zora", "zora:0xa", {"title": "a"})
+
+    job = jobs.claim(skip_actions=("clanker",))
+    assert (job.action, job.state) == ("zora", "running")
+    assert jobs.claim(skip_actions=("clanker",)) is None
+
+    job = jobs.claim()
+    assert job.action == "clanker"
+    assert jobs.claim() is None
+    jobs.close()
+
+
+def test_recover_expired_leaves_live_workers_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    live = JobQueue(path, owner="worker-0", lease_ttl=-1)
+    dead = JobQueue(path, owner="worker-1", lease_ttl=-1)
+    live.enqueue("zora", "zora:0xa", {})
+    live.enqueue("zora", "zora:0xb", {})
+    assert live.claim() is not None
+    assert dead.claim() is not None
+
+    # Both leases lapsed, but worker-0 is still heartbeating
+    assert live.recover_expired(live_workers=["worker-0"]) == 1
+    assert live.counts()["running"] == 1
+    assert live.counts()["pending"] == 1
+    live.close()
+    dead.close()
+
+
+def test_job_workers_survive_a_locked_queue(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    jobs = JobQueue(path, owner="worker-0")
+    jobs.enqueue("zora", "zora:0xa", {})
+    done = []
+
+    async def handler(job):
+        done.append(job.idempotency_key)
+        return "ok"
+
+    async def run():
+        # Another worker holds the write lock, then an attempt fails outright
+        other = sqlite3.connect(path)
+        other.execute("BEGIN IMMEDIATE")
+        claim = jobs.claim
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        def flaky_claim(skip_actions=()):
+            if failures:
+                raise failures.pop()
+            return claim(skip_actions)
+
+        jobs.claim = flaky_claim
+        workers = JobWorkers(jobs, {"zora": handler}, workers=2, poll_interval=0.05)
+        workers.start()
+        # The event loop keeps running while claims wait for the lock
+        started = time.monotonic()
+        await asyncio.sleep(0.2)
+        waited = time.monotonic() - started
+        other.rollback()
+        other.close()
+        for _ in range(100):
+            if done:
+                break
+            await asyncio.sleep(0.02)
+        await workers.stop()
+        return waited
+
+    assert asyncio.run(run()) < 1
+    assert done == ["zora:0xa"]
+    assert jobs.counts()["confirmed"] == 1
+    jobs.close()